@@ -0,0 +1,387 @@
+"""Latency/throughput benchmark for the Purchase Order API.
+
+Generates synthetic datasets with the generatePOData.js schema, drives every
+endpoint in-process through the ASGI app at several concurrency levels and
+writes p50/p95/p99 latency, throughput and peak RSS per endpoint as JSON.
+
+    python benchmark.py --rows 10000 100000 --concurrency 1 8 --output before.json
+    python benchmark.py compare before.json after.json
+
+Each dataset size runs in its own subprocess so RSS numbers aren't skewed by
+the previous size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import itertools
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Value pools from generatePOData.js
+VENDORS = [
+    'Acme Corp', 'Global Supplies Inc', 'Tech Solutions Ltd', 'Premium Materials Co', 'Industrial Parts Group',
+    'Office Plus', 'Digital Systems', 'Component World', 'Quality Distributors', 'Enterprise Solutions'
+]
+ITEMS = [
+    'Laptop', 'Monitor', 'Keyboard', 'Mouse', 'USB Cable', 'Desk Chair', 'Office Desk', 'Filing Cabinet',
+    'Printer Paper', 'Ink Cartridge', 'Server RAM', 'SSD Storage', 'Network Switch', 'Router', 'Power Supply'
+]
+PRIORITIES = ['Low', 'Medium', 'High', 'Urgent']
+PAYMENT_TERMS = ['Net 30', 'Net 60', 'Net 90', 'COD', '2/10 Net 30', 'Due on Receipt']
+CURRENCIES = ['USD', 'EUR', 'GBP', 'CAD', 'AUD']
+DEPARTMENTS = ['IT', 'Operations', 'Finance', 'HR', 'Logistics']
+LOCATIONS = ['New York', 'Los Angeles', 'Chicago', 'Toronto', 'London', 'Sydney']
+APPROVAL_STATUSES = ['Pending', 'Approved', 'Rejected']
+NOTES = ['', 'Urgent delivery required', 'Special packaging needed', 'Standard delivery', 'Quality inspection required']
+CREATED_BY = ['John Smith', 'Sarah Johnson', 'Mike Davis', 'Emily Chen', 'Robert Wilson']
+ASSIGNED_TO = ['Alice Brown', 'David Lee', 'Lisa Anderson', 'Tom Martinez', 'Jessica White']
+
+# PO Dates are spread over this many days before the start date (generatePOData.js stamps
+# every order with today, which would make the date-range endpoints trivially cheap)
+DATE_SPAN_DAYS = 365
+START_DATE = date(2026, 1, 1)
+
+PERCENTILES = (50, 95, 99)
+
+
+def generate_orders(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A purchase_orders.csv-shaped frame of `rows` random orders"""
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+    po_dates = np.datetime64(START_DATE) - rng.integers(0, DATE_SPAN_DAYS, rows).astype('timedelta64[D]')
+    delivery = po_dates + rng.integers(5, 31, rows).astype('timedelta64[D]')
+
+    # 1-5 line items per order: quantity 1-100, unit price 0-1000
+    num_items = rng.integers(1, 6, rows)
+    quantities = rng.integers(1, 101, (rows, 5))
+    prices = np.round(rng.random((rows, 5)) * 1000, 2)
+    item_names = rng.integers(0, len(ITEMS), (rows, 5))
+    present = np.arange(5) < num_items[:, None]
+    line_totals = np.round(quantities * prices, 2) * present
+    items_total = line_totals.sum(axis=1)
+    descriptions = [
+        '; '.join(f"{quantities[i, j]}x {ITEMS[item_names[i, j]]}" for j in range(num_items[i]))
+        for i in range(rows)
+    ]
+
+    return pd.DataFrame({
+        'PO Number': [f"PO-{START_DATE.year}-{n}" for n in rng.integers(10000, 100000, rows)],
+        'Vendor': pick(VENDORS),
+        'PO Date': po_dates,
+        'Delivery Date': delivery,
+        'Expected Delivery': delivery,
+        'Item Description': descriptions,
+        'Quantity': (quantities * present).sum(axis=1),
+        'Unit Price': prices[:, 0],
+        'Total Amount': np.round(items_total, 2),
+        'Currency': pick(CURRENCIES),
+        'Payment Terms': pick(PAYMENT_TERMS),
+        'Department': pick(DEPARTMENTS),
+        'Location': pick(LOCATIONS),
+        'Approval Status': pick(APPROVAL_STATUSES),
+        'Priority': pick(PRIORITIES),
+        'Notes': pick(NOTES),
+        'Tax Amount': np.round(items_total * 0.1, 2),
+        'Grand Total': np.round(items_total * 1.1, 2),
+        'Created By': pick(CREATED_BY),
+        'Assigned To': pick(ASSIGNED_TO),
+    })
+
+
+def dataset_path(data_dir: str, rows: int, seed: int) -> str:
+    """Generate (once) and return the CSV for a dataset size"""
+    path = os.path.join(data_dir, f"orders_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        df = generate_orders(rows, seed)
+        df.to_csv(path + ".tmp", index=False, date_format='%Y-%m-%d', float_format='%.2f')
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def order_bodies():
+    """A new-order body with a PO Number not used before, per call (so creates never hit 409)"""
+    numbers = itertools.count(1)
+    po_date = START_DATE.isoformat()
+    delivery = (START_DATE + timedelta(days=14)).isoformat()
+    return lambda: {
+        "PO Number": f"PO-BENCH-{os.getpid()}-{next(numbers)}", "Vendor": VENDORS[0], "PO Date": po_date,
+        "Delivery Date": delivery, "Expected Delivery": delivery, "Item Description": f"2x {ITEMS[0]}",
+        "Quantity": 2, "Unit Price": 150.0, "Total Amount": 300.0, "Currency": CURRENCIES[0],
+        "Payment Terms": PAYMENT_TERMS[0], "Department": DEPARTMENTS[0], "Location": LOCATIONS[0],
+        "Approval Status": APPROVAL_STATUSES[0], "Priority": PRIORITIES[0], "Notes": NOTES[1],
+        "Tax Amount": 30.0, "Grand Total": 330.0, "Created By": CREATED_BY[0], "Assigned To": ASSIGNED_TO[0],
+    }
+
+
+def endpoints(sample_po_numbers: list) -> list:
+    """(name, method, path, params, json body) for every endpoint, with representative arguments
+
+    A callable body is called for each request, for endpoints that need a different body every time.
+    """
+    first = START_DATE - timedelta(days=DATE_SPAN_DAYS)
+    month_end = first + timedelta(days=30)
+    po = sample_po_numbers[0]
+    return [
+        ("orders", "GET", "/api/orders", {}, None),
+        ("orders_filtered", "GET", "/api/orders", {"vendor": "Acme", "priority": "High", "limit": 50}, None),
+        ("orders_cursor", "GET", "/api/orders", {"cursor": "", "limit": 500, "department": "IT"}, None),
+        ("order_by_po", "GET", f"/api/orders/{po}", {}, None),
+        ("orders_batch", "POST", "/api/orders/batch", {}, {"po_numbers": sample_po_numbers}),
+        ("statistics", "GET", "/api/statistics", {}, None),
+        ("vendors", "GET", "/api/vendors", {}, None),
+        ("departments", "GET", "/api/departments", {}, None),
+        ("export", "POST", "/api/export", {"vendor": "Office", "priority": "Low"}, None),
+        ("approval_summary", "GET", "/api/approval-summary", {"limit": 100}, None),
+        ("assigned_to", "GET", "/api/assigned-to", {"assigned_to": "Alice", "limit": 100}, None),
+        ("by_department", "GET", "/api/by-department", {}, None),
+        ("by_location", "GET", "/api/by-location", {"location": "York"}, None),
+        ("by_payment_terms", "GET", "/api/by-payment-terms", {}, None),
+        ("by_currency", "GET", "/api/by-currency", {}, None),
+        ("by_created_by", "GET", "/api/by-created-by", {"created_by": "Sarah"}, None),
+        ("high_value_orders", "GET", "/api/high-value-orders", {"min_amount": 100000, "top_n": 100}, None),
+        ("pending_approvals", "GET", "/api/pending-approvals", {"limit": 100}, None),
+        ("orders_by_date_range", "GET", "/api/orders-by-date-range",
+         {"start_date": first.isoformat(), "end_date": month_end.isoformat(), "limit": 100}, None),
+        ("orders_by_date_range_weekly", "GET", "/api/orders-by-date-range",
+         {"start_date": first.isoformat(), "end_date": START_DATE.isoformat(), "group_by": "week"}, None),
+        ("by_item_description", "GET", "/api/by-item-description", {"item": "Laptop"}, None),
+        ("timeseries_by_department", "GET", "/api/timeseries", {"period": "month", "split_by": "department"}, None),
+        ("search_vendor", "GET", "/api/search", {"query": "acme", "search_fields": "vendor", "limit": 100}, None),
+        ("search_all", "GET", "/api/search", {"query": "laptop", "search_fields": "all", "limit": 100}, None),
+        ("summary_dashboard", "GET", "/api/summary-dashboard", {}, None),
+        # Streamed; every request reads the whole CSV body before it is timed as done
+        ("download", "GET", "/api/download", {}, None),
+        # Writes last: each one replaces the snapshot and with it every cached payload
+        ("update_order", "PATCH", f"/api/orders/{po}", {}, {"Priority": "High"}),
+        ("create_order", "POST", "/api/orders", {}, order_bodies()),
+    ]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS; only a high-water mark either way
+        scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class RssSampler:
+    """Peak resident set size while the `with` block runs, sampled every 10ms"""
+
+    def __init__(self):
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(0.01):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+async def drive(client, method: str, path: str, params: dict, body, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent clients and summarize the latencies"""
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body() if callable(body) else body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000
+    result = {"concurrency": concurrency, "requests": len(ms), "errors": errors}
+    result.update({f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES})
+    result.update({
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(len(ms) / elapsed, 1),
+        "peak_rss_mb": round(rss.peak, 1),
+    })
+    return result
+
+
+async def run_size(csv_path: str, requests: int, levels: list, only: list) -> dict:
+    """Benchmark every endpoint against one dataset; runs inside the per-size subprocess"""
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("httpx is required for the benchmark: pip install httpx")
+    import main
+
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    snapshot = main.order_store.current()
+    load_seconds = time.perf_counter() - started
+    sample = snapshot.column('PO Number').drop_duplicates().head(100).tolist()
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, method, path, params, body in endpoints(sample):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            # The first request pays for cold caches and lazily built indexes
+            started = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body() if callable(body) else body)
+            cold_ms = (time.perf_counter() - started) * 1000
+            entry = {
+                "endpoint": name,
+                "request": f"{method} {path}",
+                "params": params,
+                "status": response.status_code,
+                "response_bytes": len(response.content),
+                "cold_ms": round(cold_ms, 3),
+                "levels": [await drive(client, method, path, params, body, requests, c) for c in levels],
+            }
+            results.append(entry)
+            print(f"  {name:<28} cold {cold_ms:9.1f} ms  " + "  ".join(
+                f"c={level['concurrency']}: p50 {level['p50_ms']:.1f} p99 {level['p99_ms']:.1f} ms "
+                f"{level['throughput_rps']:.0f} rps" for level in entry["levels"]), file=sys.stderr)
+
+    return {
+        "rows": snapshot.num_rows,
+        "data_file": csv_path,
+        "load_seconds": round(load_seconds, 3),
+        "rss_before_load_mb": round(rss_before, 1),
+        "rss_after_load_mb": round(current_rss_mb(), 1),
+        "endpoints": results,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def benchmark(args) -> dict:
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "datasets": [],
+    }
+    for rows in args.rows:
+        print(f"Dataset: {rows} rows", file=sys.stderr)
+        csv_path = dataset_path(args.data_dir, rows, args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                PO_DATA_FILE=csv_path,
+                # Writes go to a throwaway log and are never compacted into the shared dataset
+                PO_WAL_FILE=os.path.join(tmp, "bench.wal"),
+                PO_COMPACT_INTERVAL="1e9",
+            )
+            command = [sys.executable, os.path.abspath(__file__), "_size", csv_path,
+                       "--requests", str(args.requests), "--concurrency", *map(str, args.concurrency)]
+            if args.only:
+                command += ["--only", *args.only]
+            output = subprocess.run(command, env=env, stdout=subprocess.PIPE, check=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        report["datasets"].append(json.loads(output))
+    return report
+
+
+def compare(base: dict, new: dict, threshold: float) -> int:
+    """Print p50/p95/throughput ratios between two reports; returns the number of regressions"""
+    def index(report):
+        return {
+            (dataset["rows"], entry["endpoint"], level["concurrency"]): level
+            for dataset in report["datasets"] for entry in dataset["endpoints"] for level in entry["levels"]
+        }
+    before, after = index(base), index(new)
+    regressions = 0
+    print(f"{'rows':>8} {'endpoint':<28} {'c':>3} {'p50 ms':>17} {'p95 ms':>17} {'rps':>15}")
+    for key in sorted(before.keys() & after.keys()):
+        old, cur = before[key], after[key]
+        ratio = cur["p95_ms"] / old["p95_ms"] if old["p95_ms"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        rows, name, concurrency = key
+        print(f"{rows:>8} {name:<28} {concurrency:>3} {old['p50_ms']:>8.2f}>{cur['p50_ms']:<8.2f}"
+              f"{old['p95_ms']:>8.2f}>{cur['p95_ms']:<8.2f} {old['throughput_rps']:>7.0f}>{cur['throughput_rps']:<7.0f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Purchase Order API endpoints")
+    subcommands = parser.add_subparsers(dest="command")
+
+    run = subcommands.add_parser("run", help="Run the benchmark (default)")
+    compare_parser = subcommands.add_parser("compare", help="Compare two benchmark reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Flag endpoints whose p95 grew by more than this fraction")
+    size = subcommands.add_parser("_size")  # internal: one dataset, in a fresh process
+    size.add_argument("csv_path")
+
+    for sub in (parser, run, size):
+        sub.add_argument("--requests", type=int, default=200, help="Requests per endpoint per concurrency level")
+        sub.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Concurrent clients")
+        sub.add_argument("--only", nargs="+", help="Only endpoints whose name contains one of these")
+    for sub in (parser, run):
+        sub.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                         help="Dataset sizes, e.g. 10000 100000 1000000")
+        sub.add_argument("--seed", type=int, default=0)
+        sub.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data"),
+                         help="Where generated datasets are cached")
+        sub.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.base) as f, open(args.new) as g:
+            sys.exit(1 if compare(json.load(f), json.load(g), args.threshold) else 0)
+    elif args.command == "_size":
+        print(json.dumps(asyncio.run(run_size(args.csv_path, args.requests, args.concurrency, args.only))))
+    else:
+        report = json.dumps(benchmark(args), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(report + "\n")
+        else:
+            print(report)
@@ -1,13 +1,147 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Request, Response
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.routing import Match
 import pandas as pd
+import numpy as np
 import os
-from typing import List, Dict, Optional
+import asyncio
+import base64
+import contextvars
+import cProfile
+import functools
+import hashlib
+import json
+import io
+import logging
+import pstats
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, List, Dict, Optional
 from pathlib import Path
+from pydantic import TypeAdapter
+from email.utils import formatdate, parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the order store so the first request doesn't pay for the CSV parse"""
+    if os.path.exists(DATA_FILE_PATH):
+        order_store.current()
+        order_store.start()
+    yield
+    order_store.close()
+    data_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="Purchase Order API", description="API to read and manage Purchase Orders from CSV", lifespan=lifespan)
+
+# GET endpoints whose responses outlive any one dataset snapshot (a live event stream)
+UNVERSIONED_PATHS = {"/api/stream/dashboard"}
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETag/Last-Modified on /api GETs, answering unchanged repeats with 304 Not Modified"""
+    path = request.url.path
+    if request.method != "GET" or not path.startswith("/api/") or path in UNVERSIONED_PATHS:
+        return await call_next(request)
+    try:
+        version, last_modified = await run_in_pool(response_validators, "reporting_currency" in request.query_params)
+    except HTTPException:
+        # No data file; let the endpoint report it
+        return await call_next(request)
+
+    query = hashlib.blake2b(f"{path}?{sorted(request.query_params.multi_items())}".encode(), digest_size=8).hexdigest()
+    headers = {
+        "ETag": f'W/"{version}-{query}"',
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if not_modified(request, headers["ETag"], last_modified):
+        metrics.inc("po_cache_requests_total", cache="http", result="hit")
+        return Response(status_code=304, headers=headers)
+    metrics.inc("po_cache_requests_total", cache="http", result="miss")
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
+def response_validators(converted: bool) -> tuple:
+    """(version, last_modified) for a response, covering the rate table when amounts are converted"""
+    version, last_modified = order_store.validators()
+    if converted:
+        rates_version, rates_modified = exchange_rates.validators()
+        version, last_modified = f"{version}-{rates_version}", max(last_modified, rates_modified)
+    return version, last_modified
+
+
+def not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Whether the client's cached copy of a response tagged with weak `etag` is current.
+
+    If-None-Match takes precedence over If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: a W/ prefix dropped or added by a proxy doesn't matter
+        return any(tag.strip() in (etag, etag[2:], "*") for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Per-route latency and phase histograms, optional JSON access logs and X-Profile reports"""
+    profile = request.headers.get("x-profile") if PROFILING_ENABLED else None
+    timings = RequestTimings(profile)
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    elapsed = time.perf_counter() - started
+
+    if timings.handler_done is not None:
+        # FastAPI validates and encodes the handler's return value after it hands it back
+        timings.phases["serialize"] += time.perf_counter() - timings.handler_done
+    route = route_label(request.scope)
+    metrics.observe("po_request_duration_seconds", elapsed, route=route, method=request.method,
+                    status=str(response.status_code))
+    for name, seconds in timings.phases.items():
+        metrics.observe("po_request_phase_seconds", seconds, route=route, phase=name)
+    metrics.observe("po_request_phase_seconds", max(elapsed - sum(timings.phases.values()), 0.0), route=route, phase="other")
+
+    if JSON_LOGS:
+        access_logger.info(json.dumps({
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "method": request.method,
+            "path": request.url.path,
+            "query": str(request.url.query),
+            "route": route,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 3),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in timings.phases.items()},
+            "cache": dict(timings.cache),
+        }))
+    if timings.profile_report is not None:
+        phases = ", ".join(f"{name} {seconds * 1000:.2f}ms" for name, seconds in timings.phases.items())
+        report = f"{request.method} {request.url.path} -> {response.status_code} in {elapsed * 1000:.2f}ms\nphases: {phases}\n\n"
+        return PlainTextResponse(report + timings.profile_report, headers={"X-Profiled-Status": str(response.status_code)})
+    return response
 
-app = FastAPI(title="Purchase Order API", description="API to read and manage Purchase Orders from CSV")
 
 # Enable CORS for all origins (allow voice dashboard and other clients)
 app.add_middleware(
@@ -18,13 +152,2264 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Compress larger responses; Brotli when brotli-asgi is installed, gzip otherwise
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Path to CSV file
 CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), "purchase_orders.csv")
 
-# Helper function to check if CSV exists
-def check_csv_exists():
-    if not os.path.exists(CSV_FILE_PATH):
-        raise HTTPException(status_code=404, detail="CSV file not found. Please run generatePOData.js first.")
+# File the API serves from: the CSV itself, or a Feather/Parquet copy made with `python main.py convert`
+DATA_FILE_PATH = os.environ.get("PO_DATA_FILE", CSV_FILE_PATH)
+COLUMNAR_EXTENSIONS = ('.feather', '.arrow', '.parquet')
+
+# Low-cardinality text columns, stored as categoricals to keep memory and group-bys cheap
+CATEGORICAL_COLUMNS = [
+    'Vendor', 'Currency', 'Payment Terms', 'Department', 'Location',
+    'Approval Status', 'Priority', 'Created By', 'Assigned To'
+]
+TEXT_COLUMNS = ['PO Number', 'Item Description', 'Notes']
+DATE_COLUMNS = ['PO Date', 'Delivery Date', 'Expected Delivery']
+NUMERIC_COLUMNS = ['Quantity', 'Unit Price', 'Total Amount', 'Tax Amount', 'Grand Total']
+# Columns in the order's own currency, converted by reporting_currency=
+AMOUNT_COLUMNS = ['Unit Price', 'Total Amount', 'Tax Amount', 'Grand Total']
+# Amounts are written to CSV with two decimals, as generatePOData.js writes them
+CSV_FLOAT_FORMAT = '%.2f'
+
+# Exchange rates for reporting_currency=: each currency's value in USD from an effective date on
+RATES_FILE_PATH = os.environ.get("PO_RATES_FILE", os.path.join(os.path.dirname(__file__), "exchange_rates.csv"))
+
+# Column order of purchase_orders.csv (see generatePOData.js)
+ORDER_COLUMNS = [
+    'PO Number', 'Vendor', 'PO Date', 'Delivery Date', 'Expected Delivery', 'Item Description',
+    'Quantity', 'Unit Price', 'Total Amount', 'Currency', 'Payment Terms', 'Department', 'Location',
+    'Approval Status', 'Priority', 'Notes', 'Tax Amount', 'Grand Total', 'Created By', 'Assigned To'
+]
+# May be left out of a new order, or cleared; the rest are required
+OPTIONAL_ORDER_COLUMNS = ['Delivery Date', 'Notes', 'Assigned To']
+
+# Write-ahead log for POST/PATCH writes, and how often it is folded back into the data file
+WAL_FILE_PATH = os.environ.get("PO_WAL_FILE", DATA_FILE_PATH + ".wal")
+COMPACT_INTERVAL_SECONDS = float(os.environ.get("PO_COMPACT_INTERVAL", "30"))
+# Writes arriving within this window are applied to the dataset as one batch
+APPLY_BATCH_SECONDS = 0.05
+# Snapshots kept for cursors issued from them: at most this many, each for this long after its latest cursor
+SNAPSHOT_HISTORY = 4
+CURSOR_TTL_SECONDS = float(os.environ.get("PO_CURSOR_TTL", "300"))
+
+# Threads running pandas work off the event loop, and how long a request may wait for one
+POOL_SIZE = int(os.environ.get("PO_POOL_SIZE", str(min(32, (os.cpu_count() or 1) + 4))))
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("PO_REQUEST_TIMEOUT", "30"))
+# Set by `python main.py serve --workers N`; worker processes then coordinate writes through file locks
+SHARED_STORE = int(os.environ.get("PO_WORKERS", "1")) > 1
+
+data_pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="po-data")
+
+# One JSON line per request on the po.access logger
+JSON_LOGS = os.environ.get("PO_JSON_LOGS", "0") == "1"
+# Lets clients send `X-Profile: 1` (cProfile) or `X-Profile: pyinstrument` to get a profile instead of the response
+PROFILING_ENABLED = os.environ.get("PO_ALLOW_PROFILING", "0") == "1"
+
+access_logger = logging.getLogger("po.access")
+if JSON_LOGS:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    access_logger.addHandler(_handler)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+
+class MetricsRegistry:
+    """Counters and histograms rendered in the Prometheus text exposition format"""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    HELP = {
+        "po_request_duration_seconds": ("histogram", "Request latency by route, method and status"),
+        "po_request_phase_seconds": ("histogram", "Time requests spent in each phase (load, filter, aggregate, serialize, other)"),
+        "po_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)"),
+        "po_snapshot_builds_total": ("counter", "Dataset snapshots built, by reason (file reload or applied writes)"),
+        "po_snapshot_build_seconds": ("histogram", "Time to build a dataset snapshot, by reason"),
+        "po_compaction_seconds": ("histogram", "Time to fold the write-ahead log into the data file"),
+        "po_writes_total": ("counter", "Orders created or updated, by operation"),
+        "po_dataset_rows": ("gauge", "Rows in the current snapshot"),
+        "po_dataset_version": ("gauge", "Snapshots this process has built"),
+        "po_pending_writes": ("gauge", "Logged writes not yet folded into a snapshot"),
+        "po_data_pool_threads": ("gauge", "Threads in the data pool"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = defaultdict(float)
+        self._histograms: Dict[tuple, list] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        timings = request_timings.get()
+        if timings is not None and name == "po_cache_requests_total":
+            timings.cache[f"{labels['cache']}_{labels['result']}"] += 1
+        with self._lock:
+            self._counters[(name, tuple(labels.items()))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts, then sum and count
+                histogram = self._histograms[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self, gauges: Dict[str, float]) -> str:
+        def labels(pairs, extra=()):
+            pairs = list(pairs) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                                  for key, value in pairs) + "}"
+
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        lines = []
+        described = set()
+
+        def describe(name, kind, text):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, pairs), value in sorted(counters.items()):
+            describe(name, *self.HELP.get(name, ("counter", name)))
+            lines.append(f"{name}{labels(pairs)} {value:g}")
+        for (name, pairs), histogram in sorted(histograms.items()):
+            describe(name, *self.HELP.get(name, ("histogram", name)))
+            cumulative = 0
+            for bound, count in zip(self.BUCKETS, histogram):
+                cumulative += count
+                lines.append(f"{name}_bucket{labels(pairs, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{name}_bucket{labels(pairs, [('le', '+Inf')])} {histogram[-1]}")
+            lines.append(f"{name}_sum{labels(pairs)} {histogram[-2]:.6f}")
+            lines.append(f"{name}_count{labels(pairs)} {histogram[-1]}")
+        for name, value in gauges.items():
+            describe(name, *self.HELP.get(name, ("gauge", name)))
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Wall time one request spent in each phase. Nested phases pause the enclosing one."""
+
+    def __init__(self, profile: Optional[str] = None):
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.cache: Counter = Counter()
+        self.profile = profile
+        self.profile_report: Optional[str] = None
+        # When the endpoint function returned, to time FastAPI's encoding of its result
+        self.handler_done: Optional[float] = None
+        self._stack: List[list] = []
+
+
+metrics = MetricsRegistry()
+request_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the enclosed time to `name` in the current request's timings"""
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    now = time.perf_counter()
+    if timings._stack:
+        outer = timings._stack[-1]
+        timings.phases[outer[0]] += now - outer[1]
+    timings._stack.append([name, now])
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        inner = timings._stack.pop()
+        timings.phases[inner[0]] += now - inner[1]
+        if timings._stack:
+            timings._stack[-1][1] = now
+
+
+def timed(name: str):
+    """Decorator form of phase()"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profiled(timings: RequestTimings, call):
+    """Run call() under cProfile or pyinstrument and keep the report on timings"""
+    if timings.profile == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            timings.profile_report = "pyinstrument is not installed: pip install pyinstrument\n"
+            return call()
+        profiler = Profiler(async_mode="disabled")
+        profiler.start()
+        try:
+            return call()
+        finally:
+            profiler.stop()
+            timings.profile_report = profiler.output_text(unicode=False, color=False)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(call)
+    finally:
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+        timings.profile_report = report.getvalue()
+
+
+def run_in_pool(func, *args):
+    """Run func in the data pool, keeping the request's context (timings) visible to it"""
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return asyncio.get_running_loop().run_in_executor(data_pool, call)
+
+
+def offload(handler):
+    """Run a synchronous endpoint in the data pool so pandas work never blocks the event loop.
+
+    Time spent queued for a free thread counts towards the timeout. A handler
+    that times out returns 504; its thread finishes in the background.
+    """
+    @functools.wraps(handler)
+    async def endpoint(*args, **kwargs):
+        call = functools.partial(handler, *args, **kwargs)
+        timings = request_timings.get()
+        if timings is not None and timings.profile:
+            call = functools.partial(profiled, timings, call)
+        try:
+            result = await asyncio.wait_for(run_in_pool(call), REQUEST_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Request timed out after {REQUEST_TIMEOUT_SECONDS:g}s")
+        if timings is not None:
+            timings.handler_done = time.perf_counter()
+        return result
+    return endpoint
+
+
+_route_paths: Dict = {}
+
+
+def route_label(scope) -> str:
+    """Route path template a request matched, for metric labels"""
+    if not _route_paths:
+        _route_paths.update({route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+    endpoint = scope.get("endpoint")
+    if endpoint in _route_paths:
+        return _route_paths[endpoint]
+    # Answered before routing (a 304 from conditional_get)
+    for route in app.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+def read_orders_csv(path: str) -> pd.DataFrame:
+    """Parse the PO CSV with typed columns (categoricals, datetimes, floats)"""
+    dtypes = {col: 'category' for col in CATEGORICAL_COLUMNS}
+    dtypes.update({col: str for col in TEXT_COLUMNS})
+    return pd.read_csv(path, dtype=dtypes, parse_dates=DATE_COLUMNS)
+
+
+def coerce_order_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Give a frame built from records the same dtypes read_orders_csv produces"""
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col])
+    # A count stays integer even with missing values (e.g. from logs written before they were required)
+    if df['Quantity'].hasnans:
+        df['Quantity'] = df['Quantity'].astype('Int64')
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].astype(object)
+    return df
+
+
+def upsert_column(series: pd.Series, positions: np.ndarray, values: pd.Series) -> pd.Series:
+    """A copy of series with the rows at positions set to the first values and the rest appended"""
+    updated = len(positions)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+        categories = series.cat.categories
+        categories = categories.append(pd.Index(values.dropna().unique()).difference(categories))
+        new_codes = pd.Categorical(values, categories=categories).codes
+        old_codes = series.cat.codes.to_numpy()
+        # Wide enough for codes of the added categories
+        codes = np.concatenate([old_codes, new_codes[updated:]]).astype(np.result_type(old_codes, new_codes))
+        codes[positions] = new_codes[:updated]
+        return pd.Series(pd.Categorical.from_codes(codes, categories), name=series.name)
+    if isinstance(series.dtype, np.dtype) and isinstance(values.dtype, np.dtype):
+        # e.g. an integer column that gets a float becomes float
+        dtype = np.result_type(series.dtype, values.dtype)
+    elif isinstance(values.dtype, np.dtype):
+        dtype = series.dtype
+    else:
+        # e.g. an integer column that gets a null becomes nullable
+        dtype = values.dtype
+    values = values.astype(dtype)
+    result = pd.concat([series.astype(dtype, copy=False), values.iloc[updated:]], ignore_index=True)
+    result.iloc[positions] = values.iloc[:updated].to_numpy()
+    return result.rename(series.name)
+
+
+class OrderPatch:
+    """Full order records upserted, keyed on PO Number, into a dataset with a known PO index.
+
+    An existing PO Number has its first row replaced in place and new numbers
+    are appended. Later records win, so replaying a log twice is harmless.
+    The records are typed once, and applied to one column at a time.
+    """
+
+    def __init__(self, records: List[Dict], po_index: Dict[str, int]):
+        latest = {}
+        for record in records:
+            latest[record['PO Number']] = record
+        updates = {po_index[po]: record for po, record in latest.items() if po in po_index}
+        creates = [record for po, record in latest.items() if po not in po_index]
+        # Rows replaced, then the PO Numbers appended, in order
+        self.positions = np.fromiter(updates, dtype=np.int64, count=len(updates))
+        self.created = [record['PO Number'] for record in creates]
+        # The new contents of those rows, with the dtypes read_orders_csv produces
+        self.values = coerce_order_types(pd.DataFrame(list(updates.values()) + creates, columns=ORDER_COLUMNS))
+
+    def apply(self, series: pd.Series) -> pd.Series:
+        return upsert_column(series, self.positions, self.values[series.name])
+
+
+def read_wal(path: str) -> List[Dict]:
+    """Entries of a write-ahead log file, stopping at a torn final line"""
+    entries = []
+    try:
+        f = open(path, encoding='utf-8')
+    except FileNotFoundError:
+        return entries
+    with f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return entries
+
+
+def repair_wal(path: str):
+    """Cut a torn final line (left by a crash mid-append) off a write-ahead log.
+
+    read_wal stops at a torn line, so anything appended after one would be
+    lost on the next replay.
+    """
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end != f.seek(0, os.SEEK_END):
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def normalize_order_fields(fields: Dict, create: bool = False) -> Dict:
+    """Validate a POST (`create`) or PATCH body and convert values to the form stored in the log"""
+    unknown = sorted(set(fields) - set(ORDER_COLUMNS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    required = [col for col in ORDER_COLUMNS if col not in OPTIONAL_ORDER_COLUMNS]
+    missing = [col for col in required if (create or col in fields) and fields.get(col) in (None, "")]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing required fields: {', '.join(missing)}")
+    normalized = {}
+    for col, value in fields.items():
+        if value is None or value == "":
+            normalized[col] = None
+            continue
+        try:
+            if col == 'Quantity':
+                number = float(value)
+                if not number.is_integer():
+                    raise ValueError(value)
+                value = int(number)
+            elif col in NUMERIC_COLUMNS:
+                value = float(value)
+            elif col in DATE_COLUMNS:
+                value = pd.to_datetime(value).strftime('%Y-%m-%d')
+            else:
+                value = str(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid value for {col}: {value!r}")
+        normalized[col] = value
+    return normalized
+
+
+def is_columnar(path: str) -> bool:
+    return path.lower().endswith(COLUMNAR_EXTENSIONS)
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow is required for Feather/Parquet data files: pip install pyarrow")
+    return pyarrow
+
+
+def write_orders_file(df: pd.DataFrame, path: str):
+    """Write orders as CSV, Feather (.feather/.arrow) or Parquet, chosen by extension.
+
+    Feather is written uncompressed so it can be memory-mapped without a copy.
+    The file is written next to the target and renamed into place, so a
+    running server never sees a half-written file.
+    """
+    tmp_path = path + ".tmp"
+    if is_columnar(path):
+        pa = import_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if path.lower().endswith('.parquet'):
+            pa.parquet.write_table(table, tmp_path)
+        else:
+            # One record batch per column, so numeric columns can be mapped without a copy
+            pa.feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    else:
+        format_dates(df).to_csv(tmp_path, index=False, float_format=CSV_FLOAT_FORMAT)
+    os.replace(tmp_path, path)
+
+
+def convert_to_columnar(csv_path: str, output_path: str) -> int:
+    """Write the typed CSV contents to a Feather or Parquet file"""
+    df = read_orders_csv(csv_path)
+    write_orders_file(df, output_path)
+    return len(df)
+
+
+class ColumnarFile:
+    """Column-projecting reader over a Feather/Arrow IPC or Parquet file.
+
+    Feather files are memory-mapped, so columns nobody reads are never paged
+    in; Parquet files are read one column chunk at a time on request.
+    """
+
+    def __init__(self, path: str):
+        pa = import_pyarrow()
+        if path.lower().endswith('.parquet'):
+            self._parquet = pa.parquet.ParquetFile(path, memory_map=True)
+            self._table = None
+            self.column_names = self._parquet.schema_arrow.names
+            self.num_rows = self._parquet.metadata.num_rows
+        else:
+            self._parquet = None
+            self._table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            self.column_names = self._table.column_names
+            self.num_rows = self._table.num_rows
+
+    def read(self, columns: List[str]) -> pd.DataFrame:
+        if self._parquet is not None:
+            return self._parquet.read(columns=columns).to_pandas()
+        return pd.DataFrame({name: self._to_series(name) for name in columns}, copy=False)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def _to_series(self, name: str) -> pd.Series:
+        # Null-free numeric and date columns are wrapped in place, so processes
+        # mapping the same file share those pages instead of copying them.
+        # Text and dictionary columns are converted into this process's memory.
+        pa = import_pyarrow()
+        column = self._table.column(name)
+        if (column.num_chunks == 1 and column.null_count == 0
+                and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+                     or (pa.types.is_timestamp(column.type) and column.type.tz is None))):
+            return pd.Series(column.chunk(0).to_numpy(zero_copy_only=True), name=name, copy=False)
+        return column.to_pandas().rename(name)
+
+
+class PatchedSource:
+    """A snapshot source (a DataFrame or ColumnarFile) with logged writes applied.
+
+    Holds every record written since the base was read, so a column is
+    patched once, straight from the base, the first time it is read.
+    """
+
+    def __init__(self, base, base_index: Dict[str, int], records: List[Dict], num_rows: Optional[int] = None):
+        self.base = base
+        # PO Number -> row position in base
+        self.base_index = base_index
+        self.records = records
+        self.column_names = list(base.columns) if isinstance(base, pd.DataFrame) else list(base.column_names)
+        self._patch: Optional[OrderPatch] = None
+        self._lock = threading.Lock()
+        if num_rows is None:
+            num_rows = len(base) + len(self.patch().created)
+        self.num_rows = num_rows
+
+    def patch(self) -> OrderPatch:
+        with self._lock:
+            if self._patch is None:
+                self._patch = OrderPatch(self.records, self.base_index)
+            return self._patch
+
+    def read(self, columns: List[str]) -> pd.DataFrame:
+        base = self.base[columns] if isinstance(self.base, pd.DataFrame) else self.base.read(columns)
+        patch = self.patch()
+        return pd.DataFrame({name: patch.apply(base[name]) for name in columns}, copy=False)
+
+
+class AggregateCache:
+    """Per-snapshot cache of group-by rollups and the payloads built from them.
+
+    Each rollup is computed with a single vectorized groupby the first time it
+    is needed and reused until the snapshot is replaced, so the cache is keyed
+    by dataset version implicitly. Endpoint payloads are cached here too, keyed
+    by endpoint name and filter arguments.
+    """
+
+    MAX_ENTRIES = 512
+
+    def __init__(self, snapshot: 'OrderSnapshot'):
+        self.snapshot = snapshot
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                metrics.inc("po_cache_requests_total", cache="aggregates", result="hit")
+                return self._entries[key]
+        metrics.inc("po_cache_requests_total", cache="aggregates", result="miss")
+        with phase("aggregate"):
+            value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return value
+
+    def summary(self, by: str) -> pd.DataFrame:
+        """size/sum/mean/min/max of Grand Total per value of `by`, in first-appearance order"""
+        column = self.snapshot.column
+        return self.get(('summary', by), lambda: (
+            column('Grand Total').groupby(column(by), observed=True, sort=False)
+            .agg(['size', 'sum', 'mean', 'min', 'max'])
+        ))
+
+    def counts(self, by: str) -> Dict:
+        """Row count per value of `by`, largest first (same shape as value_counts)"""
+        return self.get(('counts', by), lambda: {
+            key: int(count)
+            for key, count in self.summary(by)['size'].sort_values(ascending=False, kind='stable').items()
+        })
+
+    def breakdown(self, by: str, column: str) -> Dict[str, Dict]:
+        """Value counts of `column` within each value of `by`"""
+        def compute():
+            keys = self.snapshot.column(by)
+            sizes = keys.groupby([keys, self.snapshot.column(column)], observed=True, sort=False).size()
+            sizes = sizes.sort_values(ascending=False, kind='stable')
+            result = {key: {} for key in self.summary(by).index}
+            for (key, value), count in sizes.items():
+                result[key][value] = int(count)
+            return result
+        return self.get(('breakdown', by, column), compute)
+
+    def distinct(self, by: str, column: str) -> Dict[str, List]:
+        """Distinct values of `column` within each value of `by`, in first-appearance order"""
+        values = self.snapshot.column
+        return self.get(('distinct', by, column), lambda: {
+            key: distinct.tolist()
+            for key, distinct in values(column).groupby(values(by), observed=True, sort=False).unique().items()
+        })
+
+    def group_positions(self, by: str) -> Dict[str, np.ndarray]:
+        """Row positions for each value of `by`"""
+        def compute():
+            keys = self.snapshot.column(by)
+            return keys.groupby(keys, observed=True, sort=False).indices
+        return self.get(('group_positions', by), compute)
+
+    def group_records(self, by: str, columns: List[str]) -> Dict[str, 'EncodedJSON']:
+        """Rows (projected to `columns`) for each value of `by`, encoded as JSON arrays"""
+        def compute():
+            frame = self.snapshot.frame(columns)
+            positions = self.group_positions(by)
+            return {key: encode_records(frame.iloc[positions[key]]) for key in self.summary(by).index}
+        return self.get(('group_records', by, tuple(columns)), compute)
+
+    def items(self) -> pd.DataFrame:
+        """orders/quantity/spend per line item, largest spend first.
+
+        The CSV prices orders, not items, so each order's Grand Total is split
+        across its items in proportion to their quantities.
+        """
+        def compute():
+            lines = self.snapshot.line_items()
+            totals = self.snapshot.column('Grand Total').to_numpy(dtype=float)
+            grouped = pd.DataFrame({
+                'position': lines.positions,
+                'quantity': lines.quantities,
+                'spend': totals[lines.positions] * lines.shares,
+            }).groupby(lines.item_codes, sort=False)
+            result = pd.DataFrame({
+                'orders': grouped['position'].nunique(),
+                'quantity': grouped['quantity'].sum(),
+                'spend': grouped['spend'].sum(),
+            })
+            result.index = lines.items[result.index]
+            return result.sort_values('spend', ascending=False, kind='stable')
+        return self.get(('items',), compute)
+
+    def item_vendors(self) -> Dict[str, List]:
+        """Distinct vendors per line item, in first-appearance order"""
+        def compute():
+            lines = self.snapshot.line_items()
+            vendors = self.snapshot.column('Vendor').iloc[lines.positions].reset_index(drop=True)
+            return {lines.items[code]: distinct.tolist()
+                    for code, distinct in vendors.groupby(lines.item_codes, sort=False).unique().items()}
+        return self.get(('item_vendors',), compute)
+
+    def encoded(self, key, compute) -> 'EncodedJSON':
+        """Like get(), but caches the payload's encoded JSON rather than the payload"""
+        return self.get(('encoded',) + key, lambda: encode_json(compute()))
+
+
+class SortedIndex:
+    """Row positions of one date or numeric column sorted by value.
+
+    A range query resolves to a contiguous slice of the sorted positions via
+    two binary searches. Rows with a missing value are left out. Numeric
+    indexes also keep prefix sums so the total over any slice is O(1).
+    """
+
+    def __init__(self, series: pd.Series):
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            values = series.to_numpy(dtype='datetime64[ns]')
+            valid = (~np.isnat(values)).nonzero()[0]
+        else:
+            values = series.to_numpy(dtype='float64')
+            valid = (~np.isnan(values)).nonzero()[0]
+        order = np.argsort(values[valid], kind='stable')
+        self.positions = valid[order]
+        self.values = values[valid][order]
+        self.prefix_sums = None
+        if self.values.dtype.kind == 'f':
+            self.prefix_sums = np.concatenate(([0.0], np.cumsum(self.values)))
+
+    def _key(self, value):
+        if self.values.dtype.kind == 'M':
+            return np.datetime64(value, 'ns')
+        return float(value)
+
+    def bounds(self, start=None, end=None) -> tuple:
+        """[lo, hi) slice of the sorted index covering start <= value <= end"""
+        lo = 0 if start is None else int(np.searchsorted(self.values, self._key(start), side='left'))
+        hi = len(self.values) if end is None else int(np.searchsorted(self.values, self._key(end), side='right'))
+        return lo, max(lo, hi)
+
+    def total(self, lo: int, hi: int) -> float:
+        """Sum of the values in the [lo, hi) slice (numeric indexes only)"""
+        return float(self.prefix_sums[hi] - self.prefix_sums[lo])
+
+    @timed("filter")
+    def range(self, start=None, end=None) -> np.ndarray:
+        lo, hi = self.bounds(start, end)
+        return self.positions[lo:hi]
+
+
+class KeysetOrder:
+    """The stable (PO Date, PO Number, row position) order cursor pagination pages through.
+
+    A cursor records the key of the last row served. On the snapshot it was
+    issued from, the next page is the rows ranked after that row. On a newer
+    snapshot the key itself is compared, so paging carries on in order across
+    a reload. Rows without a PO Date sort first.
+    """
+
+    def __init__(self, snapshot: 'OrderSnapshot'):
+        self.dates = snapshot.column('PO Date').to_numpy(dtype='datetime64[ns]').view('int64')
+        self.po_numbers = snapshot.column('PO Number').fillna('').to_numpy(dtype=object)
+        codes, _ = pd.factorize(self.po_numbers, sort=True)
+        order = np.lexsort((np.arange(len(codes)), codes, self.dates))
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+    def key(self, position: int) -> list:
+        return [int(self.dates[position]), self.po_numbers[position], int(position)]
+
+    @timed("filter")
+    def page(self, positions: np.ndarray, after: Optional[list], limit: int, resumed: bool) -> tuple:
+        """(page positions, key to resume from or None when exhausted) of `positions` after `after`"""
+        if after is not None:
+            date, po_number, position = after
+            if resumed:
+                if position >= len(self.rank):
+                    # Issued with other filters than this page's
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                positions = positions[self.rank[positions] > self.rank[position]]
+            else:
+                dates = self.dates[positions]
+                po_numbers = self.po_numbers[positions]
+                positions = positions[(dates > date) | ((dates == date) & (
+                    (po_numbers > po_number) | ((po_numbers == po_number) & (positions > position))))]
+        ranks = self.rank[positions]
+        if len(positions) > limit:
+            first = np.argpartition(ranks, limit - 1)[:limit]
+            page = positions[first[np.argsort(ranks[first])]]
+            return page, self.key(page[-1])
+        return positions[np.argsort(ranks)], None
+
+
+def encode_cursor(snapshot: 'OrderSnapshot', keys: Dict[str, Optional[list]]) -> Optional[str]:
+    """Opaque cursor for the next page of each list, or None once every list is exhausted"""
+    if all(key is None for key in keys.values()):
+        return None
+    state = json.dumps({"s": snapshot.key, "k": keys}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(snapshot key, per-list resume keys) from a cursor made by encode_cursor"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        keys = state['k']
+        valid = isinstance(state['s'], str) and all(
+            key is None or (len(key) == 3 and isinstance(key[0], int) and isinstance(key[1], str) and isinstance(key[2], int))
+            for key in keys.values()
+        )
+        if not valid or any(key is not None and key[2] < 0 for key in keys.values()):
+            raise ValueError(cursor)
+        return state['s'], keys
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def period_starts(dates: np.ndarray, period: str) -> np.ndarray:
+    """Truncate datetime64 values to the start of their day, week (Monday), month or quarter"""
+    days = dates.astype('datetime64[D]')
+    if period == "month":
+        return dates.astype('datetime64[M]')
+    if period == "quarter":
+        months = dates.astype('datetime64[M]').astype(np.int64)
+        return (months - months % 3).astype('datetime64[M]')
+    if period == "week":
+        # 1970-01-01 was a Thursday, i.e. weekday 3 counting from Monday
+        offsets = (days.astype(np.int64) + 3) % 7
+        return days - offsets.astype('timedelta64[D]')
+    return days
+
+
+def period_labels(starts: np.ndarray, period: str) -> List[str]:
+    """Labels for period starts: 2026-01-05 (day, week), 2026-01 (month), 2026-Q1 (quarter)"""
+    if period == "quarter":
+        months = starts.astype('datetime64[M]').astype(np.int64)
+        return [f"{1970 + month // 12}-Q{month % 12 // 3 + 1}" for month in months]
+    return np.datetime_as_string(starts, unit='M' if period == "month" else 'D').tolist()
+
+
+@timed("aggregate")
+def rollup_by_period(dates: np.ndarray, amounts: np.ndarray, period: str) -> List[Dict]:
+    """Order count and amount per calendar period for date-sorted rows"""
+    if not len(dates):
+        return []
+    buckets = period_starts(dates, period)
+    starts = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+    counts = np.diff(np.append(starts, len(dates)))
+    totals = np.add.reduceat(np.nan_to_num(amounts), starts)
+    labels = period_labels(buckets[starts], period)
+    return [
+        {"period": label, "orders_count": int(count), "total_amount": round(float(total), 2)}
+        for label, count, total in zip(labels, counts, totals)
+    ]
+
+
+class TimeSeriesRollups:
+    """Daily order count, Grand Total and Tax Amount, overall and per TIMESERIES_SPLITS column.
+
+    Built the first time a snapshot needs them. When writes are applied to a
+    snapshot that has them, the new snapshot's rollups are the previous ones
+    minus the replaced rows plus the new ones, so they are not rebuilt from
+    the whole dataset. Weekly,
+    monthly and quarterly buckets are summed from the daily rows, so a trend
+    query reads a few hundred rows however many orders there are.
+    """
+
+    SPLITS = [None, 'Department', 'Vendor', 'Approval Status']
+    COLUMNS = ['PO Date', 'Grand Total', 'Tax Amount'] + SPLITS[1:]
+
+    def __init__(self, tables: Dict[Optional[str], pd.DataFrame]):
+        # Indexed by day, or by (day, value of the split column)
+        self.tables = tables
+
+    @classmethod
+    def build(cls, source) -> 'TimeSeriesRollups':
+        """Rollups of a snapshot, or of anything with the same column() method"""
+        return cls({split: cls.daily(source.column, split) for split in cls.SPLITS})
+
+    @staticmethod
+    def daily(column, split: Optional[str]) -> pd.DataFrame:
+        data = pd.DataFrame({
+            'day': column('PO Date').to_numpy(dtype='datetime64[ns]').astype('datetime64[D]'),
+            'orders': 1,
+            'grand_total': column('Grand Total').to_numpy(dtype=float),
+            'tax_amount': column('Tax Amount').to_numpy(dtype=float),
+        })
+        keys = ['day']
+        if split is not None:
+            data[split] = np.asarray(column(split), dtype=object)
+            keys.append(split)
+        # Rows without a PO Date (or split value) fall out of the groupby
+        return data.groupby(keys, sort=True).sum()
+
+    def updated(self, removed: pd.DataFrame, added: pd.DataFrame) -> 'TimeSeriesRollups':
+        """Rollups with `removed` rows taken out and `added` rows put in"""
+        tables = {}
+        for split, table in self.tables.items():
+            table = table.sub(self.daily(removed.__getitem__, split), fill_value=0)
+            table = table.add(self.daily(added.__getitem__, split), fill_value=0)
+            tables[split] = table[table['orders'] > 0].sort_index()
+        return TimeSeriesRollups(tables)
+
+    def series(self, period: str, split: Optional[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Totals per period start (and split value), for PO Dates from start to end inclusive"""
+        table = self.tables[split]
+        days = table.index.get_level_values('day')
+        keep = np.ones(len(table), dtype=bool)
+        if start is not None:
+            keep &= days >= start
+        if end is not None:
+            keep &= days <= end
+        table = table[keep]
+        keys = [period_starts(days[keep].to_numpy(), period)]
+        if split is not None:
+            keys.append(table.index.get_level_values(split))
+        return table.groupby(keys, sort=True).sum()
+
+
+class BitmapIndex:
+    """Packed bitmaps of the rows holding each value of a categorical column"""
+
+    def __init__(self, series: pd.Series):
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        codes = series.cat.codes.to_numpy()
+        self.categories = series.cat.categories.astype(str)
+        self.size = len(series)
+        self.bitmaps = [np.packbits(codes == code) for code in range(len(self.categories))]
+
+    def select(self, values: List[str], exact: bool = False) -> np.ndarray:
+        """OR of the bitmaps of every category matching any of values (case-insensitive)"""
+        matched = np.zeros(len(self.categories), dtype=bool)
+        for value in values:
+            if exact:
+                matched |= np.asarray(self.categories.str.lower() == value.lower())
+            else:
+                matched |= np.asarray(self.categories.str.contains(value, case=False, na=False))
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for code in matched.nonzero()[0]:
+            result |= self.bitmaps[code]
+        return result
+
+
+class LineItems:
+    """Line items parsed out of Item Description ("56x Monitor; 57x Filing Cabinet").
+
+    One entry per line item: the order's row position, the item and its
+    quantity. Each distinct description is parsed once with vectorized string
+    methods and then expanded to every order that carries it. A line without
+    an "Nx " prefix counts as quantity 1.
+    """
+
+    LINE_PATTERN = r'^\s*(?:(\d+)\s*x\s+)?(.*?)\s*$'
+
+    def __init__(self, descriptions: pd.Series):
+        codes, uniques = pd.factorize(descriptions)
+        lines = pd.Series(np.asarray(uniques, dtype=object)).str.split(';').explode().dropna()
+        parsed = lines.str.extract(self.LINE_PATTERN)
+        parsed = parsed[parsed[1] != '']
+        table = pd.DataFrame({
+            'code': parsed.index.to_numpy(),
+            'item': parsed[1].to_numpy(),
+            'quantity': pd.to_numeric(parsed[0]).fillna(1).to_numpy(dtype=np.int64),
+        })
+        # Inner merge keeps the orders' row order
+        rows = pd.DataFrame({'position': np.arange(len(codes)), 'code': codes}).merge(table, on='code')
+
+        self.positions = rows['position'].to_numpy()
+        self.quantities = rows['quantity'].to_numpy()
+        self.item_codes, self.items = pd.factorize(rows['item'])
+        self.items = self.items.astype(str)
+        # Each line's share of its order's total quantity, for splitting order amounts across items
+        order_quantities = np.bincount(self.positions, weights=self.quantities, minlength=len(codes))
+        self.shares = self.quantities / order_quantities[self.positions]
+        # Item -> sorted row positions of the orders containing it
+        self.orders = {
+            code: np.unique(self.positions[lines])
+            for code, lines in pd.Series(self.item_codes).groupby(self.item_codes, sort=False).indices.items()
+        }
+
+    def select(self, values: List[str], exact: bool = False) -> np.ndarray:
+        """Positions of orders with an item matching any of values (case-insensitive)"""
+        matched = np.zeros(len(self.items), dtype=bool)
+        for value in values:
+            if exact:
+                matched |= np.asarray(self.items.str.lower() == value.lower())
+            else:
+                matched |= np.asarray(self.items.str.contains(value, case=False, na=False))
+        found = [self.orders[code] for code in matched.nonzero()[0]]
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+
+class FilterEngine:
+    """Evaluates OrderFilters for one snapshot.
+
+    Categorical filters are answered by OR-ing per-value bitmaps and numeric or
+    date ranges by a sorted-index slice; the pieces are AND-ed together as
+    packed bitmaps, so no filter scans strings row by row.
+    """
+
+    def __init__(self, snapshot: 'OrderSnapshot', bitmaps: Optional[Dict[str, 'BitmapIndex']] = None):
+        self.snapshot = snapshot
+        # A CurrencyView shares its snapshot's bitmaps: only amounts differ, and those aren't bitmapped
+        self._bitmaps: Dict[str, BitmapIndex] = {} if bitmaps is None else bitmaps
+
+    def bitmap_index(self, column: str) -> BitmapIndex:
+        index = self._bitmaps.get(column)
+        if index is None:
+            index = BitmapIndex(self.snapshot.column(column))
+            self._bitmaps[column] = index
+        return index
+
+    def bitmap(self, filters: 'OrderFilters') -> Optional[np.ndarray]:
+        """Packed bitmap of rows passing every filter, or None if no filter is set"""
+        result = None
+        for column, values in filters.categorical.items():
+            if values:
+                bitmap = self.bitmap_index(column).select(values, exact=filters.match == "exact")
+                result = bitmap if result is None else result & bitmap
+        for column, (low, high) in filters.ranges.items():
+            if low is None and high is None:
+                continue
+            index = self.snapshot.sorted_index(column)
+            rows = np.zeros(self.snapshot.num_rows, dtype=bool)
+            rows[index.positions[slice(*index.bounds(low, high))]] = True
+            bitmap = np.packbits(rows)
+            result = bitmap if result is None else result & bitmap
+        if filters.items:
+            rows = np.zeros(self.snapshot.num_rows, dtype=bool)
+            rows[self.snapshot.line_items().select(filters.items, exact=filters.match == "exact")] = True
+            bitmap = np.packbits(rows)
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def row_mask(self, filters: 'OrderFilters') -> Optional[np.ndarray]:
+        """Boolean mask over all rows, or None if no filter is set"""
+        bitmap = self.bitmap(filters)
+        if bitmap is None:
+            return None
+        return np.unpackbits(bitmap, count=self.snapshot.num_rows).view(bool)
+
+    @timed("filter")
+    def rows(self, column: str, value: str) -> np.ndarray:
+        """Positions of the rows whose column equals value"""
+        bitmap = self.bitmap_index(column).select([value], exact=True)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.snapshot.num_rows))
+
+    @timed("filter")
+    def apply(self, filters: 'OrderFilters', positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row positions passing filters, restricted to (and ordered like) positions if given"""
+        keep = self.row_mask(filters)
+        if positions is None:
+            return np.arange(self.snapshot.num_rows) if keep is None else np.flatnonzero(keep)
+        return positions if keep is None else positions[keep[positions]]
+
+
+def build_po_index(po_numbers: pd.Series) -> Dict[str, int]:
+    """Map PO Number -> row position; the first row wins for duplicated numbers"""
+    first = ~po_numbers.duplicated(keep='first')
+    return dict(zip(po_numbers[first], first.to_numpy().nonzero()[0].tolist()))
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ColumnIndex:
+    """Substring index over one column.
+
+    Rows are mapped to the column's distinct values (category codes or
+    factorized strings), so a query is matched against each distinct value
+    once rather than against every row. For free-text columns a trigram ->
+    value-id posting list narrows the query to a few candidates, which are
+    then verified directly.
+    """
+
+    def __init__(self, series: pd.Series, trigram_index: bool = False):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories.astype(str)
+        elif pd.api.types.is_object_dtype(series.dtype):
+            codes, values = pd.factorize(series)
+        else:
+            codes, values = pd.factorize(series.astype(str))
+        self.codes = codes
+        self.values = [str(value).lower() for value in values]
+
+        self.postings = None
+        if trigram_index:
+            postings = defaultdict(list)
+            for value_id, value in enumerate(self.values):
+                for gram in trigrams(value):
+                    postings[gram].append(value_id)
+            self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    def match_values(self, term: str) -> np.ndarray:
+        """Ids of distinct values containing term (already lower-cased)"""
+        grams = trigrams(term) if self.postings is not None else None
+        if grams:
+            lists = sorted((self.postings.get(gram) for gram in grams), key=lambda ids: -1 if ids is None else len(ids))
+            if lists[0] is None:
+                return np.array([], dtype=np.int64)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    break
+        else:
+            candidates = range(len(self.values))
+        return np.array([i for i in candidates if term in self.values[i]], dtype=np.int64)
+
+    def match_rows(self, term: str) -> np.ndarray:
+        """Boolean row mask for rows whose value contains term"""
+        hit = np.zeros(len(self.values) + 1, dtype=bool)
+        hit[self.match_values(term)] = True
+        # Missing values are coded -1 and land on the trailing False slot
+        return hit[self.codes]
+
+
+class SearchIndex:
+    """Per-snapshot inverted index used by /api/search"""
+
+    FIELDS = {
+        "vendor": ['Vendor'],
+        "po_number": ['PO Number'],
+        "item": ['Item Description'],
+        "notes": ['Notes'],
+    }
+
+    def __init__(self, snapshot: 'OrderSnapshot'):
+        self.snapshot = snapshot
+        self.size = snapshot.num_rows
+        # Built per column the first time a query touches it, with a trigram
+        # index for the free-text columns
+        self._columns: Dict[str, ColumnIndex] = {}
+
+    def column(self, name: str) -> ColumnIndex:
+        index = self._columns.get(name)
+        if index is None:
+            index = ColumnIndex(self.snapshot.column(name), trigram_index=name in TEXT_COLUMNS)
+            self._columns[name] = index
+        return index
+
+    @timed("filter")
+    def search(self, query: str, search_fields: str = "all"):
+        """Row positions matching every whitespace-separated term, plus a per-row score.
+
+        A term matches a row if it is a case-insensitive substring of any of
+        the searched columns; the score counts (term, column) matches.
+        """
+        if search_fields == "all":
+            columns = self.snapshot.column_names
+        elif search_fields in self.FIELDS:
+            columns = self.FIELDS[search_fields]
+        else:
+            return np.arange(self.size), np.zeros(self.size, dtype=np.int64)
+
+        matched = np.ones(self.size, dtype=bool)
+        scores = np.zeros(self.size, dtype=np.int64)
+        for term in query.lower().split():
+            term_hits = np.zeros(self.size, dtype=np.int64)
+            for col in columns:
+                term_hits += self.column(col).match_rows(term)
+            matched &= term_hits > 0
+            scores += term_hits
+        positions = matched.nonzero()[0]
+        return positions, scores[positions]
+
+
+class ExchangeRates:
+    """The exchange rate table, reread when the file changes.
+
+    The file has one row per currency and effective date, giving the value
+    of one unit of that currency in USD from that date until the next row.
+    Orders convert at the rates in effect on their PO Date; dates before a
+    currency's first row use its earliest rate.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._table: Dict[str, tuple] = {}
+
+    def validators(self) -> tuple:
+        """(version, last_modified) of the rate file"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Exchange rate file not found. Set PO_RATES_FILE or add exchange_rates.csv.")
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime_ns / 1e9
+
+    def load(self) -> tuple:
+        """(version, {currency: (effective dates as int64 ns, USD rates)})"""
+        version, _ = self.validators()
+        with self._lock:
+            if version != self._version:
+                rates = pd.read_csv(self.path, parse_dates=['Effective Date']).dropna()
+                rates = rates.sort_values('Effective Date', kind='stable')
+                self._table = {
+                    str(currency).upper(): (
+                        group['Effective Date'].to_numpy('datetime64[ns]').view('int64'),
+                        group['USD Rate'].to_numpy(dtype=float)
+                    )
+                    for currency, group in rates.groupby('Currency', sort=False)
+                }
+                self._version = version
+            return self._version, self._table
+
+    @staticmethod
+    def factors(table: Dict[str, tuple], currencies: pd.Series, dates: pd.Series, target: str) -> np.ndarray:
+        """Per-row multiplier taking amounts in `currencies` on `dates` to `target`.
+
+        Rows without a PO Date get NaN. Orders in a currency the table lacks
+        can't be converted, so they are a 400 rather than left out of totals.
+        """
+        if target not in table:
+            raise HTTPException(status_code=400, detail=f"No exchange rates for {target}. Available: {', '.join(sorted(table))}")
+
+        def rates_on(currency, days):
+            effective, rates = table[currency]
+            return rates[np.maximum(np.searchsorted(effective, days, side='right') - 1, 0)]
+
+        days = dates.to_numpy(dtype='datetime64[ns]').view('int64')
+        usd = np.full(len(days), np.nan)
+        # One searchsorted per currency rather than a lookup per row
+        codes, uniques = pd.factorize(currencies)
+        missing = sorted({str(currency).upper() for currency in uniques} - table.keys())
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No exchange rates for {', '.join(missing)}, the currency of some orders; "
+                       f"add them to the rates file to convert to {target}"
+            )
+        for code, currency in enumerate(uniques):
+            rows = np.flatnonzero(codes == code)
+            usd[rows] = rates_on(str(currency).upper(), days[rows])
+        factors = usd / rates_on(target, days)
+        factors[dates.isna().to_numpy()] = np.nan
+        return factors
+
+
+exchange_rates = ExchangeRates(RATES_FILE_PATH)
+
+
+class CurrencyView:
+    """A snapshot with its amount columns converted to one reporting currency.
+
+    Converted columns are computed on first use and kept, like the
+    snapshot's own, and the view has its own AggregateCache, so endpoints
+    aggregate over it exactly as over the snapshot. Its filters and sorted
+    indexes are over the converted amounts too, so min_total/max_total compare
+    in the reporting currency. Everything else is the snapshot's.
+    """
+
+    def __init__(self, snapshot: 'OrderSnapshot', currency: str, factors: np.ndarray):
+        self.snapshot = snapshot
+        self.currency = currency
+        self._factors = factors
+        self._columns: Dict[str, pd.Series] = {}
+        self._frames: Dict[Optional[tuple], pd.DataFrame] = {}
+        self._rollups: Optional[TimeSeriesRollups] = None
+        self._sorted_indexes: Dict[str, SortedIndex] = {}
+        self._lock = threading.Lock()
+        self.aggregates = AggregateCache(self)
+        self.filters = FilterEngine(self, bitmaps=snapshot.filters._bitmaps)
+
+    def __getattr__(self, name):
+        return getattr(self.snapshot, name)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.frame()
+
+    def sorted_index(self, name: str) -> SortedIndex:
+        if name not in AMOUNT_COLUMNS:
+            return self.snapshot.sorted_index(name)
+        index = self._sorted_indexes.get(name)
+        if index is None:
+            index = SortedIndex(self.column(name))
+            self._sorted_indexes[name] = index
+        return index
+
+    @property
+    def rollups(self) -> TimeSeriesRollups:
+        """Time series rollups of the converted amounts, built on first use"""
+        if self._rollups is None:
+            self._rollups = TimeSeriesRollups.build(self)
+        return self._rollups
+
+    def column(self, name: str) -> pd.Series:
+        if name not in AMOUNT_COLUMNS:
+            return self.snapshot.column(name)
+        series = self._columns.get(name)
+        if series is None:
+            series = (self.snapshot.column(name) * self._factors).round(2)
+            with self._lock:
+                series = self._columns.setdefault(name, series)
+        return series
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        key = None if columns is None else tuple(columns)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self.snapshot.frame(columns)
+            converted = {name: self.column(name) for name in AMOUNT_COLUMNS if name in frame.columns}
+            if converted:
+                frame = frame.assign(**converted)
+            self._frames[key] = frame
+        return frame
+
+
+class FilteredView:
+    """A snapshot (or CurrencyView) restricted to the rows passing some OrderFilters.
+
+    Its columns are the snapshot's taken at those rows, and it has its own
+    AggregateCache, keyset order and line items, so grouped endpoints
+    aggregate and page over it exactly as over the snapshot. Row positions
+    are the view's own.
+    """
+
+    def __init__(self, snapshot, positions: np.ndarray):
+        self.snapshot = snapshot
+        self.positions = positions
+        self.num_rows = len(positions)
+        self._columns: Dict[str, pd.Series] = {}
+        self._frames: Dict[Optional[tuple], pd.DataFrame] = {}
+        self._keyset = None
+        self._line_items = None
+        self._sorted_indexes: Dict[str, SortedIndex] = {}
+        self._lock = threading.Lock()
+        self.aggregates = AggregateCache(self)
+        self.filters = FilterEngine(self)
+
+    def __getattr__(self, name):
+        return getattr(self.snapshot, name)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.frame()
+
+    def column(self, name: str) -> pd.Series:
+        series = self._columns.get(name)
+        if series is None:
+            series = self.snapshot.column(name).iloc[self.positions].reset_index(drop=True)
+            with self._lock:
+                series = self._columns.setdefault(name, series)
+        return series
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        key = None if columns is None else tuple(columns)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self.snapshot.frame(columns).iloc[self.positions].reset_index(drop=True)
+            self._frames[key] = frame
+        return frame
+
+    def sorted_index(self, name: str) -> SortedIndex:
+        index = self._sorted_indexes.get(name)
+        if index is None:
+            index = SortedIndex(self.column(name))
+            self._sorted_indexes[name] = index
+        return index
+
+    def keyset(self) -> KeysetOrder:
+        if self._keyset is None:
+            self._keyset = KeysetOrder(self)
+        return self._keyset
+
+    def line_items(self) -> LineItems:
+        if self._line_items is None:
+            self._line_items = LineItems(self.column('Item Description'))
+        return self._line_items
+
+
+def filtered(snapshot, filters: 'OrderFilters'):
+    """snapshot, or a FilteredView of it if any of filters is set"""
+    keep = snapshot.filters.row_mask(filters)
+    return snapshot if keep is None else FilteredView(snapshot, np.flatnonzero(keep))
+
+
+class OrderSnapshot:
+    """An immutable view of the data file at one point in time.
+
+    A CSV is parsed in full up front. A columnar file is opened memory-mapped
+    and each column is converted to pandas the first time it is asked for, so
+    endpoints that project a few columns never load the rest. Indexes are
+    likewise built the first time an endpoint needs them.
+    """
+
+    def __init__(self, source, version: int, mtime_ns: int, size: int, applied_seq: int = 0,
+                 rollups: Optional[TimeSeriesRollups] = None):
+        self._source = source
+        self._columns: Dict[str, pd.Series] = {}
+        self._frames: Dict[Optional[tuple], pd.DataFrame] = {}
+        self._sorted_indexes: Dict[str, SortedIndex] = {}
+        self._views: Dict[tuple, CurrencyView] = {}
+        self._lock = threading.Lock()
+        if isinstance(source, pd.DataFrame):
+            self.column_names = list(source.columns)
+            self.num_rows = len(source)
+            self._frames[None] = source
+        else:
+            self.column_names = list(source.column_names)
+            self.num_rows = source.num_rows
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.size = size
+        # Highest write-ahead log sequence number reflected in this snapshot
+        self.applied_seq = applied_seq
+        # Identifies this snapshot's contents in pagination cursors
+        self.key = f"{mtime_ns:x}.{size:x}.{applied_seq}"
+        self._keyset = None
+        self._line_items = None
+        self._po_index: Optional[Dict[str, int]] = None
+        self._search_index: Optional[SearchIndex] = None
+        # Carried over from the previous snapshot when a write batch updated them in place
+        self._rollups = rollups
+        self.loaded_at = time.time()
+        self.aggregates = AggregateCache(self)
+        self.filters = FilterEngine(self)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """All columns"""
+        return self.frame()
+
+    def column(self, name: str) -> pd.Series:
+        if isinstance(self._source, pd.DataFrame):
+            return self._source[name]
+        series = self._columns.get(name)
+        if series is None:
+            series = self._load_columns([name])[name]
+        return series
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The dataset projected to `columns` (all columns if None)"""
+        key = None if columns is None else tuple(columns)
+        frame = self._frames.get(key)
+        if frame is None:
+            names = self.column_names if columns is None else list(columns)
+            if isinstance(self._source, pd.DataFrame):
+                frame = self._source[names]
+            else:
+                frame = pd.DataFrame(self._load_columns(names), copy=False)
+            self._frames[key] = frame
+        return frame
+
+    @property
+    def po_index(self) -> Dict[str, int]:
+        """PO Number -> row position, built on first use"""
+        if self._po_index is None:
+            self._po_index = build_po_index(self.column('PO Number'))
+        return self._po_index
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Inverted index for /api/search, built on first use"""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self)
+        return self._search_index
+
+    @property
+    def rollups(self) -> TimeSeriesRollups:
+        """Daily time series rollups, built on first use"""
+        if self._rollups is None:
+            self._rollups = TimeSeriesRollups.build(self)
+        return self._rollups
+
+    def sorted_index(self, name: str) -> SortedIndex:
+        """Sorted index over a date or numeric column, built on first use"""
+        index = self._sorted_indexes.get(name)
+        if index is None:
+            index = SortedIndex(self.column(name))
+            self._sorted_indexes[name] = index
+        return index
+
+    def in_currency(self, currency: Optional[str]):
+        """This snapshot, or with `currency` a CurrencyView of it, cached per rate table version"""
+        if not currency:
+            return self
+        version, table = exchange_rates.load()
+        key = (currency.upper(), version)
+        view = self._views.get(key)
+        if view is None:
+            factors = exchange_rates.factors(table, self.column('Currency'), self.column('PO Date'), key[0])
+            with self._lock:
+                # Views built on an older rate table are dropped
+                self._views = {k: v for k, v in self._views.items() if k[1] == version}
+                view = self._views.setdefault(key, CurrencyView(self, key[0], factors))
+        return view
+
+    def keyset(self) -> KeysetOrder:
+        """Cursor pagination order, built on first use"""
+        if self._keyset is None:
+            self._keyset = KeysetOrder(self)
+        return self._keyset
+
+    def line_items(self) -> LineItems:
+        """Item Description parsed into line items, built on first use"""
+        if self._line_items is None:
+            self._line_items = LineItems(self.column('Item Description'))
+        return self._line_items
+
+    def _load_columns(self, names: List[str]) -> Dict[str, pd.Series]:
+        with self._lock:
+            missing = [name for name in names if name not in self._columns]
+            if missing:
+                loaded = self._source.read(missing)
+                for name in missing:
+                    self._columns[name] = loaded[name]
+            return {name: self._columns[name] for name in names}
+
+    def with_writes(self, records: List[Dict], version: int, applied_seq: int) -> 'OrderSnapshot':
+        """A new snapshot of this one with order records upserted.
+
+        Only the columns this snapshot has loaded are copied and patched now,
+        along with the PO Number index and the rollups if they are built;
+        other columns are patched from the data file when first read, and
+        other indexes are rebuilt when first used.
+        """
+        patch = OrderPatch(records, self.po_index)
+        num_rows = self.num_rows + len(patch.created)
+        if isinstance(self._source, PatchedSource):
+            source = self._source
+            source = PatchedSource(source.base, source.base_index, source.records + records, num_rows)
+        else:
+            source = PatchedSource(self._source, self.po_index, records, num_rows)
+        rollups = self._rollups
+        if rollups is not None:
+            rollups = rollups.updated(self.frame(TimeSeriesRollups.COLUMNS).iloc[patch.positions], patch.values)
+        snapshot = OrderSnapshot(source, version, self.mtime_ns, self.size, applied_seq, rollups)
+        with self._lock:
+            loaded = dict(self._columns)
+        snapshot._columns.update({name: patch.apply(series) for name, series in loaded.items()})
+        po_index = dict(self.po_index)
+        po_index.update(zip(patch.created, range(self.num_rows, num_rows)))
+        snapshot._po_index = po_index
+        return snapshot
+
+    def rebase(self, path: str, stat: os.stat_result):
+        """Note that the data file at path was just rewritten from this snapshot.
+
+        The snapshot then matches the file as it is, and the writes its source
+        carried are dropped so that later write batches don't keep them.
+        """
+        if is_columnar(path):
+            # Map the new file and load columns from it as they are used again,
+            # instead of holding the copies that were read to write it
+            source = ColumnarFile(path)
+            with self._lock:
+                self._source = source
+                self._columns = {}
+                self._frames = {}
+        else:
+            frame = self.df
+            with self._lock:
+                self._source = frame
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+
+    def lookup(self, po_number: str) -> Optional[int]:
+        """Row position of a PO Number, or None if it isn't in the dataset"""
+        return self.po_index.get(po_number)
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+class OrderStore:
+    """Process-wide cache of the parsed data file (CSV, Feather or Parquet).
+
+    The file is loaded once and reloaded only when its mtime or size changes.
+    A reload builds a complete new snapshot before swapping it in, so requests
+    holding the previous snapshot keep a consistent view.
+
+    Writes are appended to an fsync'd write-ahead log and are visible to PO
+    Number lookups immediately. A background thread folds batches of them into
+    a new snapshot, and another periodically compacts the log into the data
+    file. Readers never wait for either.
+
+    With `shared`, several worker processes serve the same files. Appends and
+    compactions then take file locks next to the log, and a process reloads
+    when another one has appended to the log.
+    """
+
+    def __init__(self, path: str, wal_path: str, shared: bool = False):
+        self.path = path
+        self.wal_path = wal_path
+        self.shared = shared
+        self._snapshot: Optional[OrderSnapshot] = None
+        # Snapshots that issued cursors recently, by key -> (snapshot, monotonic time of the
+        # latest cursor), so paging through a cursor isn't disturbed by reloads
+        self._history: OrderedDict = OrderedDict()
+        self._history_lock = threading.Lock()
+        self._version = 0
+        # _lock guards snapshot builds, _write_lock serializes log appends.
+        # When both are needed, _write_lock is taken first.
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._seq = 0
+        self._compacted_seq = 0
+        self._pending: List[Dict] = []
+        self._recent: Dict[str, Dict] = {}
+        self._wal = None
+        # Log state the snapshot plus _pending reflects (shared stores only)
+        self._wal_seen = None
+        # Time of the latest logged write, for Last-Modified
+        self._last_write_at = 0.0
+        self._changed = threading.Event()
+        self._stopping = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def current(self, wait: bool = False) -> OrderSnapshot:
+        """Return the latest snapshot, reloading if the file changed on disk.
+
+        With `wait`, an in-progress reload is waited for instead of answering
+        from the previous snapshot.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if is_columnar(self.path):
+                raise HTTPException(status_code=404, detail="Data file not found. Please run `python main.py convert` first.")
+            raise HTTPException(status_code=404, detail="CSV file not found. Please run generatePOData.js first.")
+
+        wal = self._wal_state() if self.shared else None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.matches(stat) and wal == self._wal_seen:
+            return snapshot
+
+        with phase("load"):
+            # While another thread is building a snapshot, keep serving the previous one
+            if not self._lock.acquire(blocking=wait or snapshot is None):
+                return snapshot
+            try:
+                # Another request may have reloaded while we waited for the lock
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot.matches(stat) and wal == self._wal_seen:
+                    return snapshot
+                snapshot = self._load(stat)
+                self._swap(snapshot)
+                self._wal_seen = wal
+                return snapshot
+            finally:
+                self._lock.release()
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return self.current().frame(columns)
+
+    def _swap(self, snapshot: OrderSnapshot):
+        self._snapshot = snapshot
+        self._expire_history()
+
+    def _expire_history(self):
+        expired = time.monotonic() - CURSOR_TTL_SECONDS
+        with self._history_lock:
+            while self._history and (len(self._history) > SNAPSHOT_HISTORY
+                                     or next(iter(self._history.values()))[1] < expired):
+                self._history.popitem(last=False)
+
+    def cursor(self, snapshot, keys: Dict[str, Optional[list]]) -> Optional[str]:
+        """encode_cursor(), keeping `snapshot` for CURSOR_TTL_SECONDS so the next page comes from it"""
+        cursor = encode_cursor(snapshot, keys)
+        if cursor is not None:
+            # A CurrencyView or FilteredView is retained as the snapshot underneath it
+            while not isinstance(snapshot, OrderSnapshot):
+                snapshot = snapshot.snapshot
+            with self._history_lock:
+                self._history[snapshot.key] = (snapshot, time.monotonic())
+                self._history.move_to_end(snapshot.key)
+            self._expire_history()
+        return cursor
+
+    def resume(self, cursor: Optional[str]) -> tuple:
+        """(snapshot, per-list resume keys, resumed) for a request's cursor parameter.
+
+        Pages come from the snapshot the cursor was issued from while it is
+        still retained, so rows don't shift under a reload between pages.
+        After that, paging continues on the current snapshot from the keys.
+        """
+        if not cursor:
+            return self.current(), {}, False
+        key, keys = decode_cursor(cursor)
+        self._expire_history()
+        with self._history_lock:
+            retained = self._history.get(key)
+        snapshot = retained[0] if retained is not None else None
+        if snapshot is None:
+            current = self.current()
+            if current.key != key:
+                return current, keys, False
+            snapshot = current
+        if any(after is not None and after[2] >= snapshot.num_rows for after in keys.values()):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return snapshot, keys, True
+
+    def _load(self, stat: os.stat_result) -> OrderSnapshot:
+        """Read the data file and replay the write-ahead log on top of it"""
+        started = time.perf_counter()
+        # Our writes up to here are durable in the data file or the log, so all are replayed
+        applied_seq = max(self._compacted_seq, self._seq)
+        source = ColumnarFile(self.path) if is_columnar(self.path) else read_orders_csv(self.path)
+        entries = read_wal(self.wal_path + ".compacting") + read_wal(self.wal_path)
+        if entries:
+            po_numbers = source['PO Number'] if isinstance(source, pd.DataFrame) else source.read(['PO Number'])['PO Number']
+            source = PatchedSource(source, build_po_index(po_numbers), [entry['record'] for entry in entries])
+            applied_seq = max(applied_seq, max(entry['seq'] for entry in entries))
+            self._seq = max(self._seq, applied_seq)
+            self._last_write_at = max(self._last_write_at, max(entry['at'] for entry in entries))
+        self._version += 1
+        snapshot = OrderSnapshot(source, self._version, stat.st_mtime_ns, stat.st_size, applied_seq)
+        metrics.inc("po_snapshot_builds_total", reason="file")
+        metrics.observe("po_snapshot_build_seconds", time.perf_counter() - started, reason="file")
+        return snapshot
+
+    def validators(self) -> tuple:
+        """(version, last_modified) of what readers currently see, for ETag/Last-Modified.
+
+        The version changes whenever the data file is replaced or a write is
+        logged or applied.
+        """
+        snapshot = self.current()
+        version = f"{snapshot.mtime_ns:x}-{snapshot.size:x}-{snapshot.applied_seq}-{self._seq}"
+        return version, max(snapshot.mtime_ns / 1e9, self._last_write_at)
+
+    def pending_record(self, po_number: str) -> Optional[Dict]:
+        """A record written but not yet folded into the snapshot (read-your-writes)"""
+        entry = self._recent.get(po_number)
+        snapshot = self._snapshot
+        if entry is not None and (snapshot is None or entry['seq'] > snapshot.applied_seq):
+            return entry['record']
+        return None
+
+    def write(self, po_number: str, fields: Dict, create: bool) -> Dict:
+        """Create or update one order and return its full record once it is durable"""
+        fields = normalize_order_fields(fields, create)
+        with self._write_lock, self._file_lock(".lock"):
+            snapshot = self.current(wait=True)
+            existing = self.pending_record(po_number)
+            if existing is None:
+                position = snapshot.lookup(po_number)
+                if position is not None:
+                    existing = to_records(snapshot.df.iloc[[position]])[0]
+            if create and existing is not None:
+                raise HTTPException(status_code=409, detail=f"PO Number {po_number} already exists")
+            if not create and existing is None:
+                raise HTTPException(status_code=404, detail=f"PO Number {po_number} not found")
+
+            record = dict.fromkeys(ORDER_COLUMNS) if create else dict(existing)
+            record.update(fields)
+            record['PO Number'] = po_number
+            # NaN from the frame isn't valid JSON; store missing values as null
+            record = {col: None if isinstance(value, float) and np.isnan(value) else value for col, value in record.items()}
+
+            seq = max(self._seq, snapshot.applied_seq) + 1
+            entry = {"seq": seq, "op": "create" if create else "update", "at": time.time(), "record": record}
+            self._append_wal(entry)
+            self._seq = max(self._seq, seq)
+            self._last_write_at = entry['at']
+            if self.shared:
+                # Only our own entry changed the log, and _pending covers it
+                self._wal_seen = self._wal_state()
+            self._pending.append(entry)
+            self._recent[po_number] = entry
+            self._start_workers()
+        metrics.inc("po_writes_total", operation=entry['op'])
+        self._changed.set()
+        return record
+
+    def _append_wal(self, entry: Dict):
+        # Another process may have rotated the log out from under our handle
+        if self._wal is not None and self.shared:
+            state = self._wal_state()
+            if state is None or state[0] != os.fstat(self._wal.fileno()).st_ino:
+                self._wal.close()
+                self._wal = None
+        if self._wal is None:
+            repair_wal(self.wal_path)
+            self._wal = open(self.wal_path, 'a', encoding='utf-8')
+        self._wal.write(json.dumps(entry) + "\n")
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def _wal_state(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.wal_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self, suffix: str, blocking: bool = True):
+        """Exclusive lock on `wal_path + suffix` across worker processes; yields False if busy"""
+        if not self.shared:
+            yield True
+            return
+        import fcntl
+        with open(self.wal_path + suffix, 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def apply_pending(self):
+        """Fold logged writes the current snapshot lacks into a new snapshot"""
+        with self._lock:
+            snapshot = self._snapshot
+            entries = [entry for entry in list(self._pending) if entry['seq'] > snapshot.applied_seq]
+            if entries:
+                started = time.perf_counter()
+                self._version += 1
+                self._swap(snapshot.with_writes([entry['record'] for entry in entries], self._version, entries[-1]['seq']))
+                metrics.inc("po_snapshot_builds_total", reason="writes")
+                metrics.observe("po_snapshot_build_seconds", time.perf_counter() - started, reason="writes")
+            applied_seq = self._snapshot.applied_seq
+        with self._write_lock:
+            self._pending = [entry for entry in self._pending if entry['seq'] > applied_seq]
+            self._recent = {po: entry for po, entry in self._recent.items() if entry['seq'] > applied_seq}
+
+    def compact(self, wait: bool = True):
+        """Rewrite the data file with every logged write and drop the folded log.
+
+        Without `wait`, returns straight away if another process is compacting.
+        """
+        with self._file_lock(".compact.lock", blocking=wait) as locked:
+            if locked:
+                self._compact()
+
+    def _compact(self):
+        compacting = self.wal_path + ".compacting"
+        with self._write_lock, self._file_lock(".lock"):
+            if not os.path.exists(self.wal_path) and not os.path.exists(compacting):
+                return
+            started = time.perf_counter()
+            # Pick up writes other processes have logged since our last reload
+            self.current(wait=True)
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            # New writes go to a fresh log while this one is folded in
+            repair_wal(self.wal_path)
+            if os.path.exists(self.wal_path):
+                if os.path.exists(compacting):
+                    # Left over from an interrupted compaction; keep entries in order
+                    with open(compacting, 'a', encoding='utf-8') as dst, open(self.wal_path, encoding='utf-8') as src:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.wal_path)
+                else:
+                    os.replace(self.wal_path, compacting)
+            self._wal_seen = self._wal_state()
+
+        self.apply_pending()
+        with self._lock:
+            snapshot = self._snapshot
+            write_orders_file(snapshot.df, self.path)
+            snapshot.rebase(self.path, os.stat(self.path))
+            self._compacted_seq = snapshot.applied_seq
+        os.remove(compacting)
+        metrics.observe("po_compaction_seconds", time.perf_counter() - started)
+
+    def start(self):
+        """Start the background apply and compaction threads"""
+        with self._write_lock:
+            self._start_workers()
+
+    def _start_workers(self):
+        if self._workers or self._stopping.is_set():
+            return
+        for target in (self._apply_loop, self._compact_loop):
+            worker = threading.Thread(target=target, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _apply_loop(self):
+        while not self._stopping.is_set():
+            if not self._changed.wait(timeout=1.0):
+                continue
+            time.sleep(APPLY_BATCH_SECONDS)
+            self._changed.clear()
+            try:
+                self.apply_pending()
+            except Exception:
+                logger.exception("Applying pending writes failed")
+
+    def _compact_loop(self):
+        while not self._stopping.wait(COMPACT_INTERVAL_SECONDS):
+            try:
+                self.compact(wait=False)
+            except Exception:
+                logger.exception("Compacting the write-ahead log failed")
+
+    def close(self):
+        """Stop the background threads and compact whatever is still in the log"""
+        self._stopping.set()
+        self._changed.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self._snapshot is not None:
+            self.compact()
+
+
+order_store = OrderStore(DATA_FILE_PATH, WAL_FILE_PATH, shared=SHARED_STORE)
+
+
+def format_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Render date columns back to YYYY-MM-DD strings, as they appear in the CSV"""
+    date_cols = [col for col in DATE_COLUMNS if col in df.columns]
+    if date_cols:
+        df = df.assign(**{col: df[col].dt.strftime('%Y-%m-%d') for col in date_cols})
+    return df
+
+
+@timed("serialize")
+def to_records(df: pd.DataFrame, columns: Optional[List[str]] = None) -> List[Dict]:
+    """Convert rows to dicts, rendering date columns back to YYYY-MM-DD"""
+    if columns is not None:
+        df = df[columns]
+    return format_dates(df).to_dict(orient="records")
+
+
+class EncodedJSON(bytes):
+    """JSON that is already encoded; encode_json() splices it into payloads as is"""
+
+
+# Encodes payloads the way FastAPI's responses do (NaN becomes null)
+PAYLOAD_ENCODER = TypeAdapter(Any)
+
+
+@timed("serialize")
+def encode_records(df: pd.DataFrame, columns: Optional[List[str]] = None) -> EncodedJSON:
+    """Rows as a JSON array of objects, encoded straight from the columns without building dicts"""
+    if columns is not None:
+        df = df[columns]
+    # Ten decimal places is exact for the CSV's amounts; NaN is written as null
+    return EncodedJSON(format_dates(df).to_json(orient="records", force_ascii=False).encode())
+
+
+def holds_encoded(value) -> bool:
+    return isinstance(value, EncodedJSON) or (
+        isinstance(value, dict) and any(holds_encoded(item) for item in value.values()))
+
+
+def encode_json(value) -> EncodedJSON:
+    """Encode a payload to JSON bytes, splicing in EncodedJSON values without re-encoding them"""
+    if isinstance(value, EncodedJSON):
+        return value
+    if isinstance(value, dict) and holds_encoded(value):
+        return EncodedJSON(b"{" + b",".join(
+            PAYLOAD_ENCODER.dump_json(str(key)) + b":" + encode_json(item) for key, item in value.items()
+        ) + b"}")
+    return EncodedJSON(PAYLOAD_ENCODER.dump_json(value))
+
+
+class EncodedJSONResponse(Response):
+    """JSON response that skips FastAPI's jsonable_encoder pass.
+
+    Built inside offloaded handlers, so the encoding runs in the data pool.
+    Content may be a payload dict (with EncodedJSON parts) or EncodedJSON.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with phase("serialize"):
+            return encode_json(content)
+
+
+class OrderFilters:
+    """Filter query parameters shared by the listing endpoints.
+
+    Categorical filters can be repeated (`?department=IT&department=HR`) and
+    match any of the given values; different filters must all match. Values
+    are case-insensitive substrings unless match=exact.
+    """
+
+    def __init__(
+        self,
+        vendor: Optional[List[str]] = Query(None),
+        priority: Optional[List[str]] = Query(None),
+        department: Optional[List[str]] = Query(None),
+        location: Optional[List[str]] = Query(None),
+        currency: Optional[List[str]] = Query(None),
+        approval_status: Optional[List[str]] = Query(None),
+        payment_terms: Optional[List[str]] = Query(None),
+        assigned_to: Optional[List[str]] = Query(None),
+        created_by: Optional[List[str]] = Query(None),
+        item: Optional[List[str]] = Query(None),
+        match: str = Query("contains", pattern="^(contains|exact)$"),
+        min_total: Optional[float] = None,
+        max_total: Optional[float] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ):
+        self.categorical = {
+            'Vendor': vendor,
+            'Priority': priority,
+            'Department': department,
+            'Location': location,
+            'Currency': currency,
+            'Approval Status': approval_status,
+            'Payment Terms': payment_terms,
+            'Assigned To': assigned_to,
+            'Created By': created_by,
+        }
+        # Orders with a matching line item (see LineItems)
+        self.items = item
+        self.match = match
+        try:
+            self.ranges = {
+                'Grand Total': (min_total, max_total),
+                'PO Date': (
+                    pd.to_datetime(date_from) if date_from else None,
+                    pd.to_datetime(date_to) if date_to else None
+                ),
+            }
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date filter: {e}")
+
+
+# Rows encoded per chunk when streaming; bounds memory regardless of result size
+STREAM_CHUNK_ROWS = 1000
+STREAM_FORMAT = Query("json", pattern="^(json|ndjson|csv)$")
+
+
+def stream_records(df: pd.DataFrame, positions: Optional[np.ndarray], columns: List[str], fmt: str,
+                   filename: str) -> StreamingResponse:
+    """Stream the rows of df at positions (all rows if None) as NDJSON or CSV.
+
+    Rows are taken from df and encoded STREAM_CHUNK_ROWS at a time, so only one
+    chunk of the result is ever copied.
+    """
+    df = df[columns]
+    count = len(df) if positions is None else len(positions)
+
+    def chunks():
+        for start in range(0, count, STREAM_CHUNK_ROWS):
+            rows = slice(start, start + STREAM_CHUNK_ROWS)
+            chunk = format_dates(df.iloc[rows if positions is None else positions[rows]])
+            if fmt == "csv":
+                yield chunk.to_csv(index=False, header=start == 0, float_format=CSV_FLOAT_FORMAT)
+            else:
+                yield chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n"
+        if fmt == "csv" and count == 0:
+            yield ",".join(columns) + "\n"
+
+    if fmt == "csv":
+        return StreamingResponse(
+            chunks(),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+        )
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def value_counts(series: pd.Series, head: Optional[int] = None) -> Dict:
+    """value_counts() as a dict, without the zero-count entries categoricals carry"""
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+    if head is not None:
+        counts = counts.head(head)
+    return counts.to_dict()
+
+
+def filter_groups(summary: pd.DataFrame, values: Optional[List[str]], exact: bool = False) -> pd.DataFrame:
+    """Rows of a group summary whose key contains (or with exact, equals) any of values, case-insensitively"""
+    if not values:
+        return summary
+    keys = summary.index.astype(str)
+    matched = np.zeros(len(keys), dtype=bool)
+    for value in values:
+        if exact:
+            matched |= np.asarray(keys.str.lower() == value.lower())
+        else:
+            matched |= np.asarray(keys.str.contains(value, case=False, regex=False))
+    return summary[matched]
+
+
+def summary_dashboard(snapshot: OrderSnapshot) -> Dict:
+    """The /api/summary-dashboard payload, computed once per snapshot"""
+    aggregates = snapshot.aggregates
+
+    def build():
+        approval_counts = aggregates.counts('Approval Status')
+        totals = snapshot.column('Grand Total')
+        taxes = snapshot.column('Tax Amount')
+        return {
+            "total_orders": snapshot.num_rows,
+            "grand_total_all": float(totals.sum()),
+            "average_order_value": float(totals.mean()),
+            "min_order_value": float(totals.min()),
+            "max_order_value": float(totals.max()),
+            "by_priority": aggregates.counts('Priority'),
+            "by_approval_status": approval_counts,
+            "by_department": aggregates.counts('Department'),
+            "by_location": aggregates.counts('Location'),
+            "by_vendor": dict(list(aggregates.counts('Vendor').items())[:10]),
+            "by_currency": aggregates.counts('Currency'),
+            "by_payment_terms": aggregates.counts('Payment Terms'),
+            "total_tax_collected": float(taxes.sum()),
+            "avg_tax_per_order": float(taxes.mean()),
+            "pending_approvals_count": approval_counts.get('Pending', 0),
+            "approved_orders_count": approval_counts.get('Approved', 0)
+        }
+
+    return aggregates.get(('summary-dashboard',), build)
+
+
+PENDING_COLUMNS = ['PO Number', 'Vendor', 'Grand Total', 'Department', 'Assigned To', 'Priority', 'Approval Status']
+
+
+def pending_positions(snapshot: OrderSnapshot, filters: Optional[OrderFilters] = None) -> np.ndarray:
+    """Row positions of orders pending approval, optionally filtered"""
+    positions = snapshot.filters.rows('Approval Status', 'Pending')
+    if filters is not None:
+        positions = snapshot.filters.apply(filters, positions)
+    return positions
+
+
+def pending_approvals(snapshot: OrderSnapshot, filters: Optional[OrderFilters] = None) -> pd.DataFrame:
+    """Orders pending approval, projected to PENDING_COLUMNS and optionally filtered"""
+    return snapshot.frame(PENDING_COLUMNS).iloc[pending_positions(snapshot, filters)]
+
+
+def pending_approvals_summary(pending: pd.DataFrame, orders: Optional[pd.DataFrame] = None, records=to_records) -> Dict:
+    """The /api/pending-approvals JSON payload, listing `orders` (default: all of pending) rendered by `records`"""
+    return {
+        "pending_count": len(pending),
+        "total_pending_value": float(pending['Grand Total'].sum()),
+        "average_pending_value": float(pending['Grand Total'].mean()),
+        "by_department": value_counts(pending['Department']),
+        "by_assigned_to": value_counts(pending['Assigned To']),
+        "orders": records(pending if orders is None else orders, PENDING_COLUMNS)
+    }
+
+
+# Page size of the embedded order lists when only a cursor is given
+DEFAULT_PAGE_SIZE = 100
+PAGE_LIMIT = Query(None, ge=1, le=1000)
+# Currency code to convert amounts to before aggregating (see exchange_rates.csv)
+REPORTING_CURRENCY = Query(None, pattern="^[A-Za-z]{3}$")
+
+
+def page_groups(snapshot: OrderSnapshot, by: str, groups: List[str], after: Dict, limit: int,
+                resumed: bool, columns: List[str]) -> tuple:
+    """One page of orders for each value of `by` in groups, and each group's resume key"""
+    positions = snapshot.aggregates.group_positions(by)
+    keyset = snapshot.keyset()
+    frame = snapshot.frame(columns)
+    orders, keys = {}, {}
+    for group in groups:
+        if group in after and after[group] is None:
+            # Already exhausted on an earlier page
+            orders[group], keys[group] = [], None
+            continue
+        page, keys[group] = keyset.page(positions[group], after.get(group), limit, resumed)
+        orders[group] = encode_records(frame.iloc[page])
+    return orders, keys
+
+
+# How often the dashboard feed checks for new data, and how long an idle stream waits between keepalives
+PUSH_INTERVAL_SECONDS = float(os.environ.get("PO_PUSH_INTERVAL", "1"))
+PUSH_KEEPALIVE_SECONDS = 15
+# Events a slow subscriber may fall behind by before it is disconnected
+PUSH_QUEUE_SIZE = 16
+
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {encode_json(data).decode()}\n\n"
+
+
+def same_value(a, b) -> bool:
+    """a == b for JSON-like payload values, with NaN equal to NaN (an average over no orders)"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_value(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_value(x, y) for x, y in zip(a, b))
+    if isinstance(a, (dict, list, tuple)) or isinstance(b, (dict, list, tuple)):
+        return False
+    return bool(pd.isna(a) and pd.isna(b) or a == b)
+
+
+def dashboard_delta(old: Dict, old_rows: Counter, new: Dict, new_rows: Counter) -> Dict:
+    """Changes between two dashboard payloads.
+
+    Summary values are sent whole when they change. Pending orders are
+    diffed as a multiset of rows (PO Numbers aren't unique), so an updated
+    order shows up as removed in its old form and added in its new one.
+    """
+    delta = {}
+    for name in ('summary_dashboard', 'pending_approvals'):
+        changed = {
+            key: value for key, value in new[name].items()
+            if key != 'orders' and not (key in old[name] and same_value(old[name][key], value))
+        }
+        if changed:
+            delta[name] = changed
+    added = [json.loads(row) for row in (new_rows - old_rows).elements()]
+    removed = [json.loads(row) for row in (old_rows - new_rows).elements()]
+    if added or removed:
+        pending = delta.setdefault('pending_approvals', {})
+        pending['orders_added'] = added
+        pending['orders_removed'] = removed
+    return delta
+
+
+class DashboardFeed:
+    """Pushes summary-dashboard and pending-approvals to server-sent event subscribers.
+
+    While anyone is subscribed, one task per process checks for a new
+    snapshot every PUSH_INTERVAL_SECONDS. On a change it builds the payloads,
+    the delta and the encoded event once and queues that to every subscriber.
+    New subscribers get the full payloads first. A subscriber that falls
+    PUSH_QUEUE_SIZE events behind is disconnected, and EventSource reconnects
+    it from a full payload.
+    """
+
+    def __init__(self, store: OrderStore):
+        self.store = store
+        self._subscribers = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Optional[OrderSnapshot] = None
+        self._payload: Optional[Dict] = None
+        self._rows: Optional[Counter] = None
+        self._event: Optional[str] = None
+
+    async def subscribe(self):
+        """Yield encoded events: a full 'snapshot', then a 'delta' per data change"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=PUSH_QUEUE_SIZE)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+        async with self._lock:
+            delta = await loop.run_in_executor(data_pool, self._build)
+            if delta:
+                self._publish(delta)
+            self._subscribers.add(queue)
+            first = self._event
+        try:
+            yield first
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), PUSH_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(PUSH_INTERVAL_SECONDS)
+            async with self._lock:
+                if not self._subscribers:
+                    # Nobody is listening; drop the payloads until someone subscribes again
+                    self._task = None
+                    self._snapshot = self._payload = self._rows = self._event = None
+                    return
+                try:
+                    delta = await loop.run_in_executor(data_pool, self._build)
+                except Exception:
+                    logger.exception("Refreshing the dashboard feed failed")
+                    continue
+                if delta:
+                    self._publish(delta)
+
+    def _build(self) -> Optional[str]:
+        """Recompute the payloads if the snapshot changed, returning the encoded delta event"""
+        snapshot = self.store.current()
+        if snapshot is self._snapshot:
+            return None
+        payload = {
+            "summary_dashboard": summary_dashboard(snapshot),
+            "pending_approvals": snapshot.aggregates.get(
+                ('pending-approvals',), lambda: pending_approvals_summary(pending_approvals(snapshot))),
+        }
+        rows = Counter(json.dumps(row, sort_keys=True) for row in payload['pending_approvals']['orders'])
+        delta = None
+        if self._payload is not None:
+            delta = dashboard_delta(self._payload, self._rows, payload, rows)
+        self._snapshot, self._payload, self._rows = snapshot, payload, rows
+        self._event = sse_event("snapshot", payload)
+        return sse_event("delta", delta) if delta else None
+
+    def _publish(self, event: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too far behind: empty its queue and tell it to disconnect
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+dashboard_feed = DashboardFeed(order_store)
+
 
 @app.get("/")
 async def root():
@@ -34,6 +2419,7 @@ async def root():
         "endpoints": {
             "all_orders": "/api/orders",
             "order_by_id": "/api/orders/{po_number}",
+            "orders_batch": "/api/orders/batch",
             "download_csv": "/api/download",
             "statistics": "/api/statistics",
             "filter": "/api/orders?vendor=&priority=",
@@ -51,466 +2437,829 @@ async def get_voice_dashboard():
     raise HTTPException(status_code=404, detail="Voice dashboard not found")
 
 @app.get("/api/orders")
-async def get_all_orders(
+@offload
+def get_all_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    vendor: Optional[str] = None,
-    priority: Optional[str] = None
+    cursor: Optional[str] = None,
+    filters: OrderFilters = Depends()
 ) -> Dict:
     """Get all Purchase Orders with pagination and filtering"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
+        snapshot, after, resumed = order_store.resume(cursor)
+        columns = ['PO Number', 'Vendor', 'PO Date', 'Grand Total', 'Priority', 'Approval Status', 'Department']
         
         # Apply filters
-        if vendor:
-            df = df[df['Vendor'].str.contains(vendor, case=False, na=False)]
-        if priority:
-            df = df[df['Priority'].str.contains(priority, case=False, na=False)]
+        positions = snapshot.filters.apply(filters)
+        total = len(positions)
+        
+        if cursor is not None:
+            # Keyset pagination in PO Date, PO Number order; `cursor=` (empty) starts at the first page
+            page, last = snapshot.keyset().page(positions, after.get('orders'), limit, resumed)
+            return EncodedJSONResponse({
+                "total": total,
+                "limit": limit,
+                "count": len(page),
+                "orders": encode_records(snapshot.frame(columns).iloc[page]),
+                "next_cursor": order_store.cursor(snapshot, {'orders': last})
+            })
         
         # Pagination
-        total = len(df)
-        df = df.iloc[skip:skip + limit]
+        df = snapshot.frame(columns).iloc[positions[skip:skip + limit]]
         
-        return {
+        return EncodedJSONResponse({
             "total": total,
             "skip": skip,
             "limit": limit,
             "count": len(df),
-            "orders": df[['PO Number', 'Vendor', 'PO Date', 'Grand Total', 'Priority', 'Approval Status', 'Department']].to_dict(orient="records")
-        }
+            "orders": encode_records(df)
+        })
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="CSV file is empty")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/orders/{po_number}")
-async def get_order_by_po(po_number: str) -> Dict:
+@offload
+def get_order_by_po(po_number: str) -> Dict:
     """Get a specific Purchase Order by PO Number"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
+        snapshot = order_store.current()
+        
+        # Writes not yet folded into the snapshot
+        record = order_store.pending_record(po_number)
+        if record is not None:
+            return {"order": record}
         
-        order = df[df['PO Number'] == po_number]
-        if order.empty:
+        position = snapshot.lookup(po_number)
+        if position is None:
             raise HTTPException(status_code=404, detail=f"PO Number {po_number} not found")
         
-        return {"order": order.to_dict(orient="records")[0]}
+        return {"order": to_records(snapshot.df.iloc[[position]])[0]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/orders/batch")
+@offload
+def get_orders_batch(po_numbers: List[str] = Body(..., embed=True)) -> Dict:
+    """Get several Purchase Orders by PO Number in one request"""
+    if len(po_numbers) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 PO Numbers per batch")
+    try:
+        snapshot = order_store.current()
+        
+        orders = []
+        positions = []
+        not_found = []
+        for po_number in po_numbers:
+            record = order_store.pending_record(po_number)
+            if record is not None:
+                orders.append(record)
+                continue
+            position = snapshot.lookup(po_number)
+            if position is None:
+                not_found.append(po_number)
+            else:
+                positions.append(position)
+                orders.append(None)
+        
+        fetched = iter(to_records(snapshot.df.iloc[positions]))
+        orders = [order if order is not None else next(fetched) for order in orders]
+        
+        return {
+            "requested": len(po_numbers),
+            "found": len(orders),
+            "not_found": not_found,
+            "orders": orders
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/orders", status_code=201)
+@offload
+def create_order(order: Dict = Body(...)) -> Dict:
+    """Create a Purchase Order (body keys are the CSV column names)"""
+    po_number = order.get('PO Number')
+    if not po_number:
+        raise HTTPException(status_code=400, detail="PO Number is required")
+    try:
+        return {"order": order_store.write(str(po_number), order, create=True)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.patch("/api/orders/{po_number}")
+@offload
+def update_order(po_number: str, changes: Dict = Body(...)) -> Dict:
+    """Update fields of a Purchase Order, e.g. {"Approval Status": "Approved"}"""
+    if changes.get('PO Number', po_number) != po_number:
+        raise HTTPException(status_code=400, detail="PO Number cannot be changed")
+    try:
+        return {"order": order_store.write(po_number, changes, create=False)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/statistics")
-async def get_statistics() -> Dict:
+@offload
+def get_statistics(reporting_currency: Optional[str] = REPORTING_CURRENCY) -> Dict:
     """Get statistics about Purchase Orders"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        stats = {
-            "total_orders": len(df),
-            "total_amount": float(df['Grand Total'].sum()),
-            "average_order_value": float(df['Grand Total'].mean()),
-            "by_priority": df['Priority'].value_counts().to_dict(),
-            "by_vendor": df['Vendor'].value_counts().to_dict(),
-            "by_department": df['Department'].value_counts().to_dict(),
-            "by_currency": df['Currency'].value_counts().to_dict(),
-            "approval_status_breakdown": df['Approval Status'].value_counts().to_dict()
-        }
-        return stats
+        snapshot = order_store.current().in_currency(reporting_currency)
+        aggregates = snapshot.aggregates
+        
+        def build():
+            totals = snapshot.column('Grand Total')
+            return {
+                "total_orders": snapshot.num_rows,
+                "total_amount": float(totals.sum()),
+                "average_order_value": float(totals.mean()),
+                "by_priority": aggregates.counts('Priority'),
+                "by_vendor": aggregates.counts('Vendor'),
+                "by_department": aggregates.counts('Department'),
+                "by_currency": aggregates.counts('Currency'),
+                "approval_status_breakdown": aggregates.counts('Approval Status')
+            }
+        
+        return EncodedJSONResponse(aggregates.encoded(('statistics',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/download")
-async def download_csv():
-    """Download the CSV file"""
-    try:
-        check_csv_exists()
-        return FileResponse(
-            path=CSV_FILE_PATH,
-            filename="purchase_orders.csv",
-            media_type="text/csv"
-        )
+@offload
+def download_csv():
+    """Download every order as CSV, as the API currently serves them (logged writes included)"""
+    try:
+        snapshot = order_store.current()
+        return stream_records(snapshot.frame(), None, snapshot.column_names, "csv", "purchase_orders")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/vendors")
-async def get_unique_vendors() -> Dict:
+@offload
+def get_unique_vendors() -> Dict:
     """Get list of unique vendors"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        vendors = df['Vendor'].unique().tolist()
+        vendors = order_store.current().column('Vendor').unique().tolist()
         return {"vendors": vendors, "count": len(vendors)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/departments")
-async def get_unique_departments() -> Dict:
+@offload
+def get_unique_departments() -> Dict:
     """Get list of unique departments"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        departments = df['Department'].unique().tolist()
+        departments = order_store.current().column('Department').unique().tolist()
         return {"departments": departments, "count": len(departments)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/export")
-async def export_filtered_data(
-    vendor: Optional[str] = None,
-    priority: Optional[str] = None
+@offload
+def export_filtered_data(
+    filters: OrderFilters = Depends(),
+    format: str = STREAM_FORMAT
 ) -> Dict:
-    """Export filtered data"""
+    """Export filtered data (format=json, or ndjson/csv to stream the rows)"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if vendor:
-            df = df[df['Vendor'].str.contains(vendor, case=False, na=False)]
-        if priority:
-            df = df[df['Priority'].str.contains(priority, case=False, na=False)]
+        snapshot = order_store.current()
+        columns = ['PO Number', 'Vendor', 'PO Date', 'Grand Total', 'Priority', 'Approval Status', 'Department', 'Assigned To']
+        positions = snapshot.filters.apply(filters)
         
-        return {"exported_records": len(df), "data": df[['PO Number', 'Vendor', 'PO Date', 'Grand Total', 'Priority', 'Approval Status', 'Department', 'Assigned To']].to_dict(orient="records")}
+        if format != "json":
+            return stream_records(snapshot.frame(columns), positions, columns, format, "export")
+        df = snapshot.frame(columns).iloc[positions]
+        return EncodedJSONResponse({"exported_records": len(df), "data": encode_records(df, columns)})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/approval-summary")
-async def get_approval_summary() -> Dict:
+@offload
+def get_approval_summary(
+    format: str = STREAM_FORMAT,
+    limit: Optional[int] = PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY,
+    filters: OrderFilters = Depends()
+) -> Dict:
     """Get approval status summary with assigned personnel and grand total amounts"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        # Group by approval status
-        approval_groups = df.groupby('Approval Status').agg({
-            'Grand Total': ['sum', 'mean', 'count'],
-            'Assigned To': lambda x: x.unique().tolist()
-        }).round(2)
-        
-        summary = {}
-        for approval_status in df['Approval Status'].unique():
-            status_df = df[df['Approval Status'] == approval_status]
-            summary[approval_status] = {
-                "count": len(status_df),
-                "total_amount": float(status_df['Grand Total'].sum()),
-                "average_amount": float(status_df['Grand Total'].mean()),
-                "assigned_to": status_df['Assigned To'].unique().tolist(),
-                "orders": status_df[['PO Number', 'Vendor', 'Assigned To', 'Grand Total', 'Priority', 'Approval Status', 'PO Date']].to_dict(orient='records')
+        snapshot, after, resumed = order_store.resume(cursor)
+        snapshot = filtered(snapshot.in_currency(reporting_currency), filters)
+        aggregates = snapshot.aggregates
+        columns = ['PO Number', 'Vendor', 'Assigned To', 'Grand Total', 'Priority', 'Approval Status', 'PO Date']
+        
+        if format != "json":
+            return stream_records(snapshot.frame(columns), None, columns, format, "approval_summary")
+        
+        def build(orders):
+            summary = {}
+            assigned = aggregates.distinct('Approval Status', 'Assigned To')
+            for approval_status, row in aggregates.summary('Approval Status').iterrows():
+                summary[approval_status] = {
+                    "count": int(row['size']),
+                    "total_amount": float(row['sum']),
+                    "average_amount": float(row['mean']),
+                    "assigned_to": assigned[approval_status],
+                    "orders": orders[approval_status]
+                }
+            
+            return {
+                "summary": summary,
+                "grand_total_all_orders": float(snapshot.column('Grand Total').sum()),
+                "total_orders": snapshot.num_rows
             }
         
-        return {
-            "summary": summary,
-            "grand_total_all_orders": float(df['Grand Total'].sum()),
-            "total_orders": len(df)
-        }
+        if limit is None and cursor is None:
+            return EncodedJSONResponse(aggregates.encoded(
+                ('approval-summary',), lambda: build(aggregates.group_records('Approval Status', columns))))
+        
+        # Paged: each status's orders continue from the cursor in PO Date, PO Number order
+        statuses = list(aggregates.summary('Approval Status').index)
+        orders, keys = page_groups(snapshot, 'Approval Status', statuses, after, limit or DEFAULT_PAGE_SIZE, resumed, columns)
+        result = build(orders)
+        result["next_cursor"] = order_store.cursor(snapshot, keys)
+        return EncodedJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/assigned-to")
-async def get_by_assigned_to(assigned_to: Optional[str] = None) -> Dict:
+@offload
+def get_by_assigned_to(
+    limit: Optional[int] = PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY,
+    filters: OrderFilters = Depends()
+) -> Dict:
     """Get orders by who it's assigned to with grand total amounts"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if assigned_to:
-            df = df[df['Assigned To'].str.contains(assigned_to, case=False, na=False)]
-        
-        result = {}
-        for person in df['Assigned To'].unique():
-            person_df = df[df['Assigned To'] == person]
-            result[person] = {
-                "orders_count": len(person_df),
-                "grand_total": float(person_df['Grand Total'].sum()),
-                "average_order_value": float(person_df['Grand Total'].mean()),
-                "approval_status_breakdown": person_df['Approval Status'].value_counts().to_dict(),
-                "orders": person_df[['PO Number', 'Vendor', 'Approval Status', 'Grand Total', 'Priority']].to_dict(orient='records')
+        snapshot, after, resumed = order_store.resume(cursor)
+        snapshot = filtered(snapshot.in_currency(reporting_currency), filters)
+        aggregates = snapshot.aggregates
+        columns = ['PO Number', 'Vendor', 'Approval Status', 'Grand Total', 'Priority']
+        summary = aggregates.summary('Assigned To')
+        
+        def build(orders):
+            result = {}
+            statuses = aggregates.breakdown('Assigned To', 'Approval Status')
+            for person, row in summary.iterrows():
+                result[person] = {
+                    "orders_count": int(row['size']),
+                    "grand_total": float(row['sum']),
+                    "average_order_value": float(row['mean']),
+                    "approval_status_breakdown": statuses[person],
+                    "orders": orders[person]
+                }
+            
+            return {
+                "by_assigned_to": result,
+                "total_people": len(result),
+                "grand_total_amount": float(summary['sum'].sum())
             }
         
-        return {
-            "by_assigned_to": result,
-            "total_people": len(result),
-            "grand_total_amount": float(df['Grand Total'].sum())
-        }
+        if limit is None and cursor is None:
+            return EncodedJSONResponse(aggregates.encoded(
+                ('assigned-to',), lambda: build(aggregates.group_records('Assigned To', columns))))
+        
+        # Paged: each person's orders continue from the cursor in PO Date, PO Number order
+        orders, keys = page_groups(snapshot, 'Assigned To', list(summary.index), after, limit or DEFAULT_PAGE_SIZE, resumed, columns)
+        result = build(orders)
+        result["next_cursor"] = order_store.cursor(snapshot, keys)
+        return EncodedJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/by-department")
-async def get_by_department(department: Optional[str] = None) -> Dict:
+@offload
+def get_by_department(reporting_currency: Optional[str] = REPORTING_CURRENCY, filters: OrderFilters = Depends()) -> Dict:
     """Get orders grouped by department with totals and metrics"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if department:
-            df = df[df['Department'].str.contains(department, case=False, na=False)]
-        
-        result = {}
-        for dept in df['Department'].unique():
-            dept_df = df[df['Department'] == dept]
-            result[dept] = {
-                "orders_count": len(dept_df),
-                "grand_total": float(dept_df['Grand Total'].sum()),
-                "average_order_value": float(dept_df['Grand Total'].mean()),
-                "priority_breakdown": dept_df['Priority'].value_counts().to_dict(),
-                "locations": dept_df['Location'].unique().tolist()
-            }
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
+        
+        def build():
+            result = {}
+            priorities = aggregates.breakdown('Department', 'Priority')
+            locations = aggregates.distinct('Department', 'Location')
+            for dept, row in aggregates.summary('Department').iterrows():
+                result[dept] = {
+                    "orders_count": int(row['size']),
+                    "grand_total": float(row['sum']),
+                    "average_order_value": float(row['mean']),
+                    "priority_breakdown": priorities[dept],
+                    "locations": locations[dept]
+                }
+            
+            return {"by_department": result, "total_departments": len(result)}
         
-        return {"by_department": result, "total_departments": len(result)}
+        return EncodedJSONResponse(aggregates.encoded(('by-department',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/by-location")
-async def get_by_location(location: Optional[str] = None) -> Dict:
+@offload
+def get_by_location(reporting_currency: Optional[str] = REPORTING_CURRENCY, filters: OrderFilters = Depends()) -> Dict:
     """Get orders grouped by location with financial summary"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if location:
-            df = df[df['Location'].str.contains(location, case=False, na=False)]
-        
-        result = {}
-        for loc in df['Location'].unique():
-            loc_df = df[df['Location'] == loc]
-            result[loc] = {
-                "orders_count": len(loc_df),
-                "grand_total": float(loc_df['Grand Total'].sum()),
-                "average_order_value": float(loc_df['Grand Total'].mean()),
-                "departments": loc_df['Department'].unique().tolist(),
-                "top_vendor": loc_df['Vendor'].value_counts().index[0] if not loc_df.empty else None
-            }
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
+        
+        def build():
+            result = {}
+            departments = aggregates.distinct('Location', 'Department')
+            vendors = aggregates.breakdown('Location', 'Vendor')
+            for loc, row in aggregates.summary('Location').iterrows():
+                result[loc] = {
+                    "orders_count": int(row['size']),
+                    "grand_total": float(row['sum']),
+                    "average_order_value": float(row['mean']),
+                    "departments": departments[loc],
+                    "top_vendor": next(iter(vendors[loc]), None)
+                }
+            
+            return {"by_location": result, "total_locations": len(result)}
         
-        return {"by_location": result, "total_locations": len(result)}
+        return EncodedJSONResponse(aggregates.encoded(('by-location',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/by-payment-terms")
-async def get_by_payment_terms(payment_terms: Optional[str] = None) -> Dict:
+@offload
+def get_by_payment_terms(reporting_currency: Optional[str] = REPORTING_CURRENCY, filters: OrderFilters = Depends()) -> Dict:
     """Get orders grouped by payment terms"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
         
-        if payment_terms:
-            df = df[df['Payment Terms'].str.contains(payment_terms, case=False, na=False)]
+        def build():
+            result = {}
+            vendors = aggregates.distinct('Payment Terms', 'Vendor')
+            for term, row in aggregates.summary('Payment Terms').iterrows():
+                result[term] = {
+                    "orders_count": int(row['size']),
+                    "grand_total": float(row['sum']),
+                    "average_order_value": float(row['mean']),
+                    "vendors": vendors[term]
+                }
+            
+            return {"by_payment_terms": result, "total_terms": len(result)}
         
-        result = {}
-        for term in df['Payment Terms'].unique():
-            term_df = df[df['Payment Terms'] == term]
-            result[term] = {
-                "orders_count": len(term_df),
-                "grand_total": float(term_df['Grand Total'].sum()),
-                "average_order_value": float(term_df['Grand Total'].mean()),
-                "vendors": term_df['Vendor'].unique().tolist()
-            }
-        
-        return {"by_payment_terms": result, "total_terms": len(result)}
+        return EncodedJSONResponse(aggregates.encoded(('by-payment-terms',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/by-currency")
-async def get_by_currency(currency: Optional[str] = None) -> Dict:
+@offload
+def get_by_currency(reporting_currency: Optional[str] = REPORTING_CURRENCY, filters: OrderFilters = Depends()) -> Dict:
     """Get orders grouped by currency"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if currency:
-            df = df[df['Currency'].str.contains(currency, case=False, na=False)]
-        
-        result = {}
-        for curr in df['Currency'].unique():
-            curr_df = df[df['Currency'] == curr]
-            result[curr] = {
-                "orders_count": len(curr_df),
-                "total_amount": float(curr_df['Grand Total'].sum()),
-                "average_amount": float(curr_df['Grand Total'].mean()),
-                "min_amount": float(curr_df['Grand Total'].min()),
-                "max_amount": float(curr_df['Grand Total'].max())
-            }
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
+        
+        def build():
+            result = {}
+            for curr, row in aggregates.summary('Currency').iterrows():
+                result[curr] = {
+                    "orders_count": int(row['size']),
+                    "total_amount": float(row['sum']),
+                    "average_amount": float(row['mean']),
+                    "min_amount": float(row['min']),
+                    "max_amount": float(row['max'])
+                }
+            
+            return {"by_currency": result, "total_currencies": len(result)}
         
-        return {"by_currency": result, "total_currencies": len(result)}
+        return EncodedJSONResponse(aggregates.encoded(('by-currency',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/by-created-by")
-async def get_by_created_by(created_by: Optional[str] = None) -> Dict:
+@offload
+def get_by_created_by(reporting_currency: Optional[str] = REPORTING_CURRENCY, filters: OrderFilters = Depends()) -> Dict:
     """Get orders created by specific person"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if created_by:
-            df = df[df['Created By'].str.contains(created_by, case=False, na=False)]
-        
-        result = {}
-        for person in df['Created By'].unique():
-            person_df = df[df['Created By'] == person]
-            result[person] = {
-                "orders_created": len(person_df),
-                "total_value": float(person_df['Grand Total'].sum()),
-                "average_value": float(person_df['Grand Total'].mean()),
-                "departments": person_df['Department'].unique().tolist(),
-                "approval_statuses": person_df['Approval Status'].value_counts().to_dict()
-            }
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
+        
+        def build():
+            result = {}
+            departments = aggregates.distinct('Created By', 'Department')
+            statuses = aggregates.breakdown('Created By', 'Approval Status')
+            for person, row in aggregates.summary('Created By').iterrows():
+                result[person] = {
+                    "orders_created": int(row['size']),
+                    "total_value": float(row['sum']),
+                    "average_value": float(row['mean']),
+                    "departments": departments[person],
+                    "approval_statuses": statuses[person]
+                }
+            
+            return {"by_created_by": result, "total_creators": len(result)}
         
-        return {"by_created_by": result, "total_creators": len(result)}
+        return EncodedJSONResponse(aggregates.encoded(('by-created-by',), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/high-value-orders")
-async def get_high_value_orders(min_amount: float = Query(5000, ge=0)) -> Dict:
-    """Get orders with grand total above specified amount"""
+@offload
+def get_high_value_orders(
+    min_amount: float = Query(5000, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    top_n: Optional[int] = Query(None, ge=1),
+    filters: OrderFilters = Depends(),
+    format: str = STREAM_FORMAT,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY
+) -> Dict:
+    """Get orders with grand total above specified amount, largest first"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        df['Grand Total'] = pd.to_numeric(df['Grand Total'], errors='coerce')
+        snapshot = order_store.current().in_currency(reporting_currency)
+        index = snapshot.sorted_index('Grand Total')
+        lo, hi = index.bounds(min_amount, max_amount)
+        positions = index.positions[lo:hi]
         
-        high_value = df[df['Grand Total'] >= min_amount].sort_values('Grand Total', ascending=False)
+        keep = snapshot.filters.row_mask(filters)
+        if keep is None:
+            count = hi - lo
+            total_value = index.total(lo, hi)
+        else:
+            selected = keep[positions]
+            positions = positions[selected]
+            count = len(positions)
+            total_value = float(index.values[lo:hi][selected].sum())
         
-        return {
+        # The index is ascending, so the largest orders are at the end of the slice
+        positions = positions[::-1][:top_n]
+        columns = ['PO Number', 'Vendor', 'Grand Total', 'Priority', 'Approval Status']
+        
+        if format != "json":
+            return stream_records(snapshot.frame(columns), positions, columns, format, "high_value_orders")
+        high_value = snapshot.frame(columns).iloc[positions]
+        return EncodedJSONResponse({
             "min_amount_filter": min_amount,
-            "count": len(high_value),
-            "total_value": float(high_value['Grand Total'].sum()),
-            "average_value": float(high_value['Grand Total'].mean()),
-            "orders": high_value[['PO Number', 'Vendor', 'Grand Total', 'Priority', 'Approval Status']].to_dict(orient='records')
-        }
+            "max_amount_filter": max_amount,
+            "top_n": top_n,
+            "count": count,
+            "total_value": total_value,
+            "average_value": total_value / count if count else None,
+            "orders": encode_records(high_value)
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/pending-approvals")
-async def get_pending_approvals() -> Dict:
+@offload
+def get_pending_approvals(
+    filters: OrderFilters = Depends(),
+    format: str = STREAM_FORMAT,
+    limit: Optional[int] = PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY
+) -> Dict:
     """Get all orders pending approval"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
+        snapshot, after, resumed = order_store.resume(cursor)
+        snapshot = snapshot.in_currency(reporting_currency)
+        positions = pending_positions(snapshot, filters)
         
-        pending = df[df['Approval Status'] == 'Pending']
+        if format != "json":
+            return stream_records(snapshot.frame(PENDING_COLUMNS), positions, PENDING_COLUMNS, format, "pending_approvals")
+        pending = snapshot.frame(PENDING_COLUMNS).iloc[positions]
+        if limit is None and cursor is None:
+            return EncodedJSONResponse(pending_approvals_summary(pending, records=encode_records))
         
-        return {
-            "pending_count": len(pending),
-            "total_pending_value": float(pending['Grand Total'].sum()),
-            "average_pending_value": float(pending['Grand Total'].mean()),
-            "by_department": pending['Department'].value_counts().to_dict(),
-            "by_assigned_to": pending['Assigned To'].value_counts().to_dict(),
-            "orders": pending[['PO Number', 'Vendor', 'Grand Total', 'Department', 'Assigned To', 'Priority', 'Approval Status']].to_dict(orient='records')
-        }
+        # Paged: orders continue from the cursor in PO Date, PO Number order
+        page, last = snapshot.keyset().page(positions, after.get('orders'), limit or DEFAULT_PAGE_SIZE, resumed)
+        result = pending_approvals_summary(pending, snapshot.frame(PENDING_COLUMNS).iloc[page], records=encode_records)
+        result["next_cursor"] = order_store.cursor(snapshot, {'orders': last})
+        return EncodedJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/orders-by-date-range")
-async def get_orders_by_date_range(start_date: str, end_date: str) -> Dict:
-    """Get orders within a date range (YYYY-MM-DD format)"""
+@offload
+def get_orders_by_date_range(
+    start_date: str,
+    end_date: str,
+    delivery_from: Optional[str] = None,
+    delivery_to: Optional[str] = None,
+    expected_from: Optional[str] = None,
+    expected_to: Optional[str] = None,
+    group_by: Optional[str] = Query(None, pattern="^(day|week|month|quarter)$"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    filters: OrderFilters = Depends(),
+    format: str = STREAM_FORMAT,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY
+) -> Dict:
+    """Get orders within a date range (YYYY-MM-DD format), sorted by PO Date"""
+    try:
+        start, end, delivery_from, delivery_to, expected_from, expected_to = (
+            pd.to_datetime(value) if value else None
+            for value in (start_date, end_date, delivery_from, delivery_to, expected_from, expected_to)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        df['PO Date'] = pd.to_datetime(df['PO Date'], errors='coerce')
+        snapshot = order_store.current().in_currency(reporting_currency)
+        index = snapshot.sorted_index('PO Date')
+        lo, hi = index.bounds(start, end)
+        positions = index.positions[lo:hi]
+        dates = index.values[lo:hi]
         
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
+        # Narrow by the other date columns using their own sorted indexes
+        for column, date_from, date_to in (
+            ('Delivery Date', delivery_from, delivery_to),
+            ('Expected Delivery', expected_from, expected_to),
+        ):
+            if date_from is not None or date_to is not None:
+                keep = np.zeros(snapshot.num_rows, dtype=bool)
+                keep[snapshot.sorted_index(column).range(date_from, date_to)] = True
+                selected = keep[positions]
+                positions = positions[selected]
+                dates = dates[selected]
         
-        filtered = df[(df['PO Date'] >= start) & (df['PO Date'] <= end)]
+        keep = snapshot.filters.row_mask(filters)
+        if keep is not None:
+            selected = keep[positions]
+            positions = positions[selected]
+            dates = dates[selected]
         
-        return {
+        columns = ['PO Number', 'PO Date', 'Vendor', 'Grand Total', 'Priority', 'Approval Status']
+        page_positions = positions[skip:skip + limit if limit is not None else None]
+        
+        if format != "json":
+            return stream_records(snapshot.frame(columns), page_positions, columns, format, "orders_by_date_range")
+        filtered = snapshot.frame(columns).iloc[positions]
+        page = filtered.iloc[skip:skip + limit if limit is not None else None]
+        result = {
             "date_range": f"{start_date} to {end_date}",
             "orders_count": len(filtered),
             "total_amount": float(filtered['Grand Total'].sum()),
             "average_amount": float(filtered['Grand Total'].mean()),
-            "orders": filtered[['PO Number', 'PO Date', 'Vendor', 'Grand Total', 'Priority', 'Approval Status']].to_dict(orient='records')
+            "skip": skip,
+            "limit": limit,
+            "count": len(page),
+            "orders": encode_records(page)
         }
+        if group_by:
+            result["rollup"] = rollup_by_period(dates, filtered['Grand Total'].to_numpy(), group_by)
+        return EncodedJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/by-item-description")
-async def get_by_item_description(item: Optional[str] = None) -> Dict:
-    """Get orders by item description"""
-    try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        if item:
-            df = df[df['Item Description'].str.contains(item, case=False, na=False)]
-        
-        result = {}
-        for desc in df['Item Description'].unique():
-            desc_df = df[df['Item Description'] == desc]
-            result[desc] = {
-                "orders_count": len(desc_df),
-                "total_value": float(desc_df['Grand Total'].sum()),
-                "average_value": float(desc_df['Grand Total'].mean()),
-                "vendors": desc_df['Vendor'].unique().tolist()
+# split_by values of /api/timeseries and the columns they split on
+TIMESERIES_SPLITS = {'department': 'Department', 'vendor': 'Vendor', 'approval_status': 'Approval Status'}
+
+
+@app.get("/api/timeseries")
+@offload
+def get_timeseries(
+    period: str = Query("month", pattern="^(day|week|month|quarter)$"),
+    split_by: Optional[str] = Query(None, pattern="^(department|vendor|approval_status)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    reporting_currency: Optional[str] = REPORTING_CURRENCY
+) -> Dict:
+    """Get order count, Grand Total and Tax Amount per day/week/month/quarter of PO Date, optionally split"""
+    try:
+        try:
+            start = pd.to_datetime(start_date) if start_date else None
+            end = pd.to_datetime(end_date) if end_date else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+        snapshot = order_store.current().in_currency(reporting_currency)
+        split = TIMESERIES_SPLITS.get(split_by)
+        
+        def build():
+            series = snapshot.rollups.series(period, split, start, end)
+            starts = series.index.get_level_values(0).to_numpy()
+            buckets = [
+                {
+                    "period": label,
+                    "orders_count": int(orders),
+                    "grand_total": round(float(grand_total), 2),
+                    "tax_amount": round(float(tax_amount), 2)
+                }
+                for label, orders, grand_total, tax_amount in zip(
+                    period_labels(starts, period), series['orders'], series['grand_total'], series['tax_amount'])
+            ]
+            result = {
+                "period": period,
+                "split_by": split_by,
+                "start_date": start_date,
+                "end_date": end_date,
+                "orders_count": int(series['orders'].sum()),
+                "grand_total": round(float(series['grand_total'].sum()), 2),
+                "tax_amount": round(float(series['tax_amount'].sum()), 2)
             }
+            if split is None:
+                result["buckets"] = buckets
+            else:
+                result["series"] = {}
+                for key, bucket in zip(series.index.get_level_values(1), buckets):
+                    result["series"].setdefault(key, []).append(bucket)
+            return result
         
-        return {"by_item_description": result, "total_items": len(result)}
+        return EncodedJSONResponse(snapshot.aggregates.encoded(('timeseries', period, split, start, end), build))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/by-item-description")
+@offload
+def get_by_item_description(
+    top_n: Optional[int] = Query(None, ge=1),
+    reporting_currency: Optional[str] = REPORTING_CURRENCY,
+    filters: OrderFilters = Depends()
+) -> Dict:
+    """Get line items across all orders with order counts, quantities, spend and vendors, largest spend first"""
+    try:
+        aggregates = filtered(order_store.current().in_currency(reporting_currency), filters).aggregates
+        
+        def build():
+            result = {}
+            vendors = aggregates.item_vendors()
+            # Orders are filtered on their items by the filter engine; the items listed are the matching ones
+            items = filter_groups(aggregates.items(), filters.items, exact=filters.match == "exact")
+            for name, row in items.iloc[:top_n].iterrows():
+                result[name] = {
+                    "orders_count": int(row['orders']),
+                    "total_quantity": int(row['quantity']),
+                    "total_value": round(float(row['spend']), 2),
+                    "average_value": round(float(row['spend']) / int(row['orders']), 2),
+                    "vendors": vendors[name]
+                }
+            
+            return {"by_item_description": result, "total_items": len(result)}
+        
+        return EncodedJSONResponse(aggregates.encoded(('by-item-description', top_n), build))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/search")
-async def search_orders(
+@offload
+def search_orders(
     query: str,
-    search_fields: str = "all"
+    search_fields: str = "all",
+    rank: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    filters: OrderFilters = Depends()
 ) -> Dict:
     """Search orders across multiple fields (all, vendor, po_number, item, notes)"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
+        snapshot = order_store.current()
         
-        query_lower = query.lower()
+        positions, scores = snapshot.search_index.search(query, search_fields)
+        keep = snapshot.filters.row_mask(filters)
+        if keep is not None:
+            selected = keep[positions]
+            positions = positions[selected]
+            scores = scores[selected]
+        if rank:
+            positions = positions[np.argsort(-scores, kind='stable')]
+        columns = ['PO Number', 'Vendor', 'Item Description', 'Grand Total', 'Priority', 'Approval Status']
+        result = snapshot.frame(columns).iloc[positions]
+        page = result.iloc[skip:skip + limit if limit is not None else None]
         
-        if search_fields == "all":
-            result = df[
-                df.astype(str).apply(lambda x: x.str.contains(query_lower, case=False, na=False)).any(axis=1)
-            ]
-        elif search_fields == "vendor":
-            result = df[df['Vendor'].str.contains(query, case=False, na=False)]
-        elif search_fields == "po_number":
-            result = df[df['PO Number'].str.contains(query, case=False, na=False)]
-        elif search_fields == "item":
-            result = df[df['Item Description'].str.contains(query, case=False, na=False)]
-        elif search_fields == "notes":
-            result = df[df['Notes'].str.contains(query, case=False, na=False)]
-        else:
-            result = df
-        
-        return {
+        return EncodedJSONResponse({
             "query": query,
             "search_fields": search_fields,
             "results_count": len(result),
             "total_value": float(result['Grand Total'].sum()),
-            "orders": result[['PO Number', 'Vendor', 'Item Description', 'Grand Total', 'Priority', 'Approval Status']].to_dict(orient='records')
-        }
+            "skip": skip,
+            "limit": limit,
+            "count": len(page),
+            "orders": encode_records(page, columns)
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/summary-dashboard")
-async def get_summary_dashboard() -> Dict:
+@offload
+def get_summary_dashboard(reporting_currency: Optional[str] = REPORTING_CURRENCY) -> Dict:
     """Get comprehensive dashboard summary with all key metrics"""
     try:
-        check_csv_exists()
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        return {
-            "total_orders": len(df),
-            "grand_total_all": float(df['Grand Total'].sum()),
-            "average_order_value": float(df['Grand Total'].mean()),
-            "min_order_value": float(df['Grand Total'].min()),
-            "max_order_value": float(df['Grand Total'].max()),
-            "by_priority": df['Priority'].value_counts().to_dict(),
-            "by_approval_status": df['Approval Status'].value_counts().to_dict(),
-            "by_department": df['Department'].value_counts().to_dict(),
-            "by_location": df['Location'].value_counts().to_dict(),
-            "by_vendor": df['Vendor'].value_counts().head(10).to_dict(),
-            "by_currency": df['Currency'].value_counts().to_dict(),
-            "by_payment_terms": df['Payment Terms'].value_counts().to_dict(),
-            "total_tax_collected": float(df['Tax Amount'].sum()),
-            "avg_tax_per_order": float(df['Tax Amount'].mean()),
-            "pending_approvals_count": len(df[df['Approval Status'] == 'Pending']),
-            "approved_orders_count": len(df[df['Approval Status'] == 'Approved'])
-        }
+        snapshot = order_store.current().in_currency(reporting_currency)
+        return EncodedJSONResponse(snapshot.aggregates.encoded(('summary-dashboard',), lambda: summary_dashboard(snapshot)))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/stream/dashboard")
+async def stream_dashboard():
+    """Server-sent events: summary-dashboard and pending-approvals payloads, then deltas as the data changes"""
+    # Surface a missing data file as a 404 before the event stream starts
+    await run_in_pool(order_store.current)
+    return StreamingResponse(
+        dashboard_feed.subscribe(),
+        media_type="text/event-stream",
+        # identity encoding keeps the compression middleware from buffering events
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics for this worker process"""
+    snapshot = order_store._snapshot
+    gauges = {
+        "po_dataset_rows": snapshot.num_rows if snapshot is not None else 0,
+        "po_dataset_version": snapshot.version if snapshot is not None else 0,
+        "po_pending_writes": len(order_store._pending),
+        "po_data_pool_threads": POOL_SIZE,
+    }
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Purchase Order API")
+    subcommands = parser.add_subparsers(dest="command")
+    serve = subcommands.add_parser("serve", help="Run the API server (default)")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=1,
+                       help="Worker processes; with more than one, all of them memory-map a single Feather file")
+    convert = subcommands.add_parser("convert", help="Convert the CSV to a columnar Feather/Parquet file")
+    convert.add_argument("--input", default=CSV_FILE_PATH, help="CSV produced by generatePOData.js")
+    convert.add_argument("--output", default=os.path.splitext(CSV_FILE_PATH)[0] + ".feather",
+                         help="Output path; .feather/.arrow for Feather, .parquet for Parquet")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        rows = convert_to_columnar(args.input, args.output)
+        print(f"Wrote {rows} rows to {args.output}")
+        print(f"Serve it with: PO_DATA_FILE={args.output} python main.py")
+    else:
+        import uvicorn
+        host = getattr(args, "host", "0.0.0.0")
+        port = getattr(args, "port", 8000)
+        workers = getattr(args, "workers", 1)
+        if workers > 1:
+            data_path = DATA_FILE_PATH
+            if not is_columnar(data_path):
+                # Fold any logged writes into the CSV, then share one memory-mapped copy of it
+                csv_store = OrderStore(data_path, WAL_FILE_PATH)
+                csv_store.current()
+                csv_store.close()
+                data_path = os.path.splitext(data_path)[0] + ".feather"
+                if not os.path.exists(data_path) or os.path.getmtime(data_path) < os.path.getmtime(DATA_FILE_PATH):
+                    rows = convert_to_columnar(DATA_FILE_PATH, data_path)
+                    print(f"Wrote {rows} rows to {data_path} for the worker processes to share")
+            # Workers are fresh interpreters that re-import this module and read these
+            os.environ["PO_DATA_FILE"] = data_path
+            os.environ.setdefault("PO_WAL_FILE", data_path + ".wal")
+            os.environ["PO_WORKERS"] = str(workers)
+            try:
+                uvicorn.run("main:app", host=host, port=port, workers=workers,
+                            app_dir=os.path.dirname(os.path.abspath(__file__)))
+            finally:
+                if data_path != DATA_FILE_PATH:
+                    # The CSV stays the store of record: write the workers' writes back to it
+                    feather_store = OrderStore(data_path, os.environ["PO_WAL_FILE"])
+                    feather_store.current()
+                    feather_store.close()
+                    write_orders_file(feather_store.frame(), DATA_FILE_PATH)
+                    print(f"Wrote {feather_store.current().num_rows} rows back to {DATA_FILE_PATH}")
+        else:
+            uvicorn.run(app, host=host, port=port)
@@ -0,0 +1,175 @@
+"""Write-ahead log replay, compaction and multi-process locking of OrderStore"""
+import os
+import threading
+import time
+
+import pytest
+
+import main
+
+
+def new_order(po_number: str, **fields) -> dict:
+    order = {
+        "PO Number": po_number, "Vendor": "Test Vendor", "PO Date": "2026-03-01",
+        "Expected Delivery": "2026-03-15", "Item Description": "2x Desk", "Quantity": 2,
+        "Unit Price": 150.0, "Total Amount": 300.0, "Currency": "USD", "Payment Terms": "Net 30",
+        "Department": "IT", "Location": "Chicago", "Approval Status": "Pending", "Priority": "Low",
+        "Tax Amount": 30.0, "Grand Total": 330.0, "Created By": "Sarah Johnson",
+    }
+    order.update(fields)
+    return order
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = str(tmp_path / "po.csv")
+    main.write_orders_file(main.read_orders_csv(main.CSV_FILE_PATH).head(50), path)
+    return path
+
+
+@pytest.fixture
+def open_store(data_file):
+    stores = []
+
+    def open_store(shared: bool = False) -> main.OrderStore:
+        store = main.OrderStore(data_file, data_file + ".wal", shared=shared)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        if not store._stopping.is_set():
+            store.close()
+
+
+def crash(store: main.OrderStore):
+    """Stop a store's threads and drop its log handle without compacting, as a killed process would"""
+    store._stopping.set()
+    store._changed.set()
+    for worker in store._workers:
+        worker.join()
+    if store._wal is not None:
+        store._wal.close()
+
+
+def test_replay_stops_at_torn_line_and_later_writes_survive(data_file, open_store):
+    store = open_store()
+    store.write("PO-T-1", new_order("PO-T-1"), create=True)
+    store.write("PO-T-2", new_order("PO-T-2"), create=True)
+    crash(store)
+    with open(data_file + ".wal", 'a', encoding='utf-8') as f:
+        f.write('{"seq": 3, "op": "create", "at": 1.0, "rec')
+
+    restarted = open_store()
+    snapshot = restarted.current()
+    assert snapshot.num_rows == 52
+    assert snapshot.lookup("PO-T-1") is not None and snapshot.lookup("PO-T-2") is not None
+    restarted.write("PO-T-3", new_order("PO-T-3"), create=True)
+    crash(restarted)
+
+    entries = main.read_wal(data_file + ".wal")
+    assert [entry['record']['PO Number'] for entry in entries] == ["PO-T-1", "PO-T-2", "PO-T-3"]
+    assert open_store().current().lookup("PO-T-3") is not None
+
+
+def test_compaction_concurrent_with_writes_loses_nothing(data_file, open_store):
+    store = open_store()
+    numbers = [f"PO-C-{i}" for i in range(40)]
+
+    def write_all():
+        for po_number in numbers:
+            store.write(po_number, new_order(po_number), create=True)
+            store.write(po_number, {"Notes": "updated"}, create=False)
+
+    writer = threading.Thread(target=write_all)
+    writer.start()
+    while writer.is_alive():
+        store.compact()
+    writer.join()
+    store.close()
+
+    assert not os.path.exists(data_file + ".wal")
+    assert not os.path.exists(data_file + ".wal.compacting")
+    df = main.read_orders_csv(data_file)
+    assert len(df) == 90
+    written = df[df['PO Number'].isin(numbers)]
+    assert sorted(written['PO Number']) == sorted(numbers)
+    assert (written['Notes'] == "updated").all()
+    assert written['Quantity'].dtype.kind == 'i'
+
+
+def test_interrupted_compaction_is_recovered_in_order(data_file, open_store):
+    store = open_store()
+    store.write("PO-R-1", new_order("PO-R-1", Notes="first"), create=True)
+    crash(store)
+    # Killed after rotating the log out, before writing the data file
+    os.replace(data_file + ".wal", data_file + ".wal.compacting")
+
+    store = open_store()
+    store.write("PO-R-1", {"Notes": "second"}, create=False)
+    store.write("PO-R-2", new_order("PO-R-2"), create=True)
+    crash(store)
+
+    restarted = open_store()
+    snapshot = restarted.current()
+    assert snapshot.column('Notes').iloc[snapshot.lookup("PO-R-1")] == "second"
+    assert snapshot.lookup("PO-R-2") is not None
+    restarted.compact()
+
+    assert not os.path.exists(data_file + ".wal")
+    assert not os.path.exists(data_file + ".wal.compacting")
+    df = main.read_orders_csv(data_file).set_index('PO Number')
+    assert len(df) == 52
+    assert df.loc["PO-R-1", 'Notes'] == "second"
+
+
+def test_shared_stores_serialize_appends_and_see_each_others_writes(data_file, open_store):
+    first, second = open_store(shared=True), open_store(shared=True)
+    first.write("PO-S-1", new_order("PO-S-1"), create=True)
+    second.write("PO-S-2", new_order("PO-S-2"), create=True)
+    with pytest.raises(main.HTTPException) as conflict:
+        second.write("PO-S-1", new_order("PO-S-1"), create=True)
+    assert conflict.value.status_code == 409
+    assert [entry['seq'] for entry in main.read_wal(data_file + ".wal")] == [1, 2]
+    assert first.current(wait=True).lookup("PO-S-2") is not None
+
+    # An append waits for the log lock another process holds
+    with first._file_lock(".lock"):
+        writer = threading.Thread(target=second.write, args=("PO-S-3", new_order("PO-S-3"), True))
+        writer.start()
+        time.sleep(0.2)
+        assert writer.is_alive()
+        assert len(main.read_wal(data_file + ".wal")) == 2
+    writer.join()
+    assert [entry['seq'] for entry in main.read_wal(data_file + ".wal")] == [1, 2, 3]
+
+
+def test_shared_compaction_skips_while_another_process_compacts(data_file, open_store):
+    first, second = open_store(shared=True), open_store(shared=True)
+    first.write("PO-L-1", new_order("PO-L-1"), create=True)
+    with first._file_lock(".compact.lock") as locked:
+        assert locked
+        second.compact(wait=False)
+        assert os.path.exists(data_file + ".wal")
+    second.compact(wait=False)
+    assert not os.path.exists(data_file + ".wal")
+    assert "PO-L-1" in set(main.read_orders_csv(data_file)['PO Number'])
+    assert first.current(wait=True).lookup("PO-L-1") is not None
+
+
+def test_compaction_keeps_a_feather_store_memory_mapped(tmp_path):
+    path = str(tmp_path / "po.feather")
+    main.write_orders_file(main.read_orders_csv(main.CSV_FILE_PATH).head(50), path)
+    store = main.OrderStore(path, path + ".wal")
+    store.write("PO-F-1", new_order("PO-F-1"), create=True)
+    store.compact()
+
+    snapshot = store.current()
+    assert isinstance(snapshot._source, main.ColumnarFile)
+    assert snapshot._columns == {}
+    assert snapshot.column('Vendor').iloc[snapshot.lookup("PO-F-1")] == "Test Vendor"
+    assert list(snapshot._columns) == ['Vendor']
+
+    store.write("PO-F-2", new_order("PO-F-2"), create=True)
+    store.close()
+    assert set(main.ColumnarFile(path).read(['PO Number'])['PO Number']) >= {"PO-F-1", "PO-F-2"}